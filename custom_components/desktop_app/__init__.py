@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any
 
 from homeassistant.components import webhook as webhook_component
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.storage import Store
 
@@ -18,25 +20,56 @@ from .const import (
     ATTR_MODEL,
     ATTR_APP_VERSION,
     ATTR_WEBHOOK_ID,
+    CONF_CAPTURE_TRAFFIC,
     DATA_API_VIEW_REGISTERED,
+    DATA_CAPTURE,
     DATA_CONFIG_ENTRIES,
     DATA_DEVICES,
+    DATA_DELETED_AT,
     DATA_DELETED_IDS,
+    DATA_DEVICE_STATES,
+    DATA_EXPIRY_SCHEDULER,
+    DATA_OPTIONS,
     DATA_PENDING_UPDATES,
+    DATA_REGISTERED_SENSORS,
+    DATA_REJECTIONS,
+    DATA_REQUEST_STATS,
+    DATA_REVOKED_WEBHOOKS,
+    DATA_SENSOR_LAST_SEEN,
+    DATA_SENSOR_SEQUENCES,
+    DATA_SENSORS_BY_DEVICE,
+    DATA_STARTUP_SPAN_STARTS,
+    DATA_STARTUP_TIMINGS,
     DATA_STORE,
+    DATA_THROTTLE,
+    DATA_UNAVAILABLE_DEVICES,
     DOMAIN,
     PLATFORMS,
     STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
     STORAGE_VERSION,
 )
-from .helpers import get_device_info
+from .capture import TrafficCapture
+from .compaction import async_setup_compaction
+from .expiry import (
+    ExpiryScheduler,
+    async_track_device_heartbeat,
+    async_untrack_device_heartbeat,
+)
+from .helpers import get_device_info, index_sensors_by_device, time_startup_phase
 from .http_api import (
     DesktopAppDataView,
     DesktopAppPingView,
     DesktopAppPingViewWithSlash,
     DesktopAppRegistrationView,
+    DesktopAppRelayView,
+    DesktopAppStateView,
 )
-from .webhook import handle_webhook
+from .profiling import async_register_services
+from .revoked import RevokedWebhooks
+from .throttle import DeviceThrottle
+from .tracing import STAGE_STORE_SAVE, new_request_stats, trace_stage
+from .webhook import async_apply_sensor_updates, handle_webhook
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,19 +80,97 @@ async def async_setup(hass: HomeAssistant, config: dict[str, Any]) -> bool:
         "Desktop App integration loading (registration API: /api/desktop_app/registrations)"
     )
 
+    load_start = time.perf_counter()
     store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
     stored_data = await store.async_load() or {}
+    load_seconds = time.perf_counter() - load_start
+
+    registered_sensors = stored_data.get(DATA_REGISTERED_SENSORS, {})
+
+    # Sensors without a persisted last-seen time (stores from before it was
+    # kept) count as seen now, so compaction never purges them right away
+    sensor_last_seen = stored_data.get(DATA_SENSOR_LAST_SEEN, {})
+    now = time.time()
+    for key in registered_sensors:
+        sensor_last_seen.setdefault(key, now)
 
     hass.data[DOMAIN] = {
         DATA_CONFIG_ENTRIES: stored_data.get(DATA_CONFIG_ENTRIES, {}),
         DATA_DEVICES: stored_data.get(DATA_DEVICES, {}),
         DATA_DELETED_IDS: stored_data.get(DATA_DELETED_IDS, []),
+        DATA_DELETED_AT: stored_data.get(DATA_DELETED_AT, {}),
         DATA_PENDING_UPDATES: {},
         DATA_STORE: store,
         DATA_API_VIEW_REGISTERED: False,
-        "registered_sensors": stored_data.get("registered_sensors", {}),
+        DATA_REGISTERED_SENSORS: registered_sensors,
+        DATA_SENSOR_LAST_SEEN: sensor_last_seen,
+        DATA_STARTUP_TIMINGS: {
+            "store_load": {"count": 1, "seconds": load_seconds},
+        },
+        DATA_STARTUP_SPAN_STARTS: {},
+        DATA_EXPIRY_SCHEDULER: ExpiryScheduler(hass),
+        DATA_UNAVAILABLE_DEVICES: set(),
+        DATA_SENSOR_SEQUENCES: {},
+        DATA_REJECTIONS: {},
+        DATA_OPTIONS: {},
+        DATA_REQUEST_STATS: new_request_stats(),
+        DATA_DEVICE_STATES: {},
+        DATA_REVOKED_WEBHOOKS: RevokedWebhooks(hass),
+        DATA_CAPTURE: None,
+        DATA_THROTTLE: DeviceThrottle(hass, async_apply_sensor_updates),
     }
 
+    # Keep answering the webhooks of removed devices with 410. Besides the
+    # persisted ones, stored registrations of tombstoned devices whose config
+    # entry is gone still name their old webhook ids.
+    revoked: RevokedWebhooks = hass.data[DOMAIN][DATA_REVOKED_WEBHOOKS]
+    for webhook_id, revoked_at in stored_data.get(DATA_REVOKED_WEBHOOKS, {}).items():
+        revoked.async_revoke(webhook_id, revoked_at)
+    deleted_ids = set(hass.data[DOMAIN][DATA_DELETED_IDS])
+    for entry_id, entry_data in hass.data[DOMAIN][DATA_CONFIG_ENTRIES].items():
+        if (
+            entry_data.get(ATTR_DEVICE_ID) in deleted_ids
+            and hass.config_entries.async_get_entry(entry_id) is None
+            and (webhook_id := entry_data.get(ATTR_WEBHOOK_ID))
+        ):
+            revoked.async_revoke(webhook_id)
+
+    # One shared timer drives device heartbeats and sensor expiry
+    scheduler: ExpiryScheduler = hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER]
+    scheduler.async_start()
+
+    @callback
+    def _async_stop(event: Event) -> None:
+        """Stop the timer and persist the last sensor values on shutdown."""
+        scheduler.async_stop()
+        # Updates only touch the store in memory; a delayed write scheduled
+        # now is flushed before Home Assistant exits
+        _async_schedule_save_store(hass)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+
+    with time_startup_phase(hass, "sensor_index"):
+        hass.data[DOMAIN][DATA_SENSORS_BY_DEVICE] = index_sensors_by_device(
+            registered_sensors
+        )
+
+    @callback
+    def _async_log_startup_timings(event: Event) -> None:
+        """Log how long each startup phase of the integration took."""
+        timings = hass.data[DOMAIN][DATA_STARTUP_TIMINGS]
+        _LOGGER.info(
+            "Desktop App startup: %s",
+            ", ".join(
+                f"{phase}={timing['seconds']:.3f}s/{timing['count']}"
+                for phase, timing in timings.items()
+            ),
+        )
+
+    if not hass.is_running:
+        hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STARTED, _async_log_startup_timings
+        )
+
     # Register API views directly. The "http" dependency in manifest.json
     # guarantees that hass.http is available at this point. Views MUST be
     # registered here (synchronously during setup) — registering later via
@@ -68,12 +179,18 @@ async def async_setup(hass: HomeAssistant, config: dict[str, Any]) -> bool:
     hass.http.register_view(DesktopAppPingViewWithSlash())
     hass.http.register_view(DesktopAppRegistrationView())
     hass.http.register_view(DesktopAppDataView())
+    hass.http.register_view(DesktopAppRelayView())
+    hass.http.register_view(DesktopAppStateView())
     hass.data[DOMAIN][DATA_API_VIEW_REGISTERED] = True
     _LOGGER.info(
         "Registered Desktop App API at /api/desktop_app/registrations, "
-        "/api/desktop_app/ping, /api/desktop_app/update"
+        "/api/desktop_app/ping, /api/desktop_app/update, /api/desktop_app/relay, "
+        "/api/desktop_app/state/{device_id}"
     )
 
+    async_register_services(hass)
+    async_setup_compaction(hass)
+
     return True
 
 
@@ -85,58 +202,92 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # API views stay registered.  No device/webhook/platform setup needed.
     if registration.get("is_hub"):
         _LOGGER.info("Desktop App hub entry loaded — API views active")
+        await _async_options_updated(hass, entry)
+        entry.async_on_unload(entry.add_update_listener(_async_options_updated))
         return True
 
     device_id = registration[ATTR_DEVICE_ID]
     webhook_id = registration[ATTR_WEBHOOK_ID]
 
-    # Store config entry data
-    hass.data[DOMAIN][DATA_CONFIG_ENTRIES][entry.entry_id] = dict(registration)
+    # Store config entry data. On a normal restart the stored copy is
+    # identical, so only schedule a write when something actually changed.
+    config_entries = hass.data[DOMAIN][DATA_CONFIG_ENTRIES]
+    registration_changed = config_entries.get(entry.entry_id) != dict(registration)
+    config_entries[entry.entry_id] = dict(registration)
 
     # Register device in device registry
-    dev_reg = dr.async_get(hass)
-    dev_reg.async_get_or_create(
-        config_entry_id=entry.entry_id,
-        identifiers={(DOMAIN, device_id)},
-        name=registration.get(ATTR_DEVICE_NAME, "Desktop App"),
-        manufacturer=registration.get(ATTR_MANUFACTURER, "Unknown"),
-        model=registration.get(ATTR_MODEL, "Desktop"),
-        sw_version=registration.get(ATTR_APP_VERSION),
-    )
+    with time_startup_phase(hass, "device_registry"):
+        dev_reg = dr.async_get(hass)
+        dev_reg.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            identifiers={(DOMAIN, device_id)},
+            name=registration.get(ATTR_DEVICE_NAME, "Desktop App"),
+            manufacturer=registration.get(ATTR_MANUFACTURER, "Unknown"),
+            model=registration.get(ATTR_MODEL, "Desktop"),
+            sw_version=registration.get(ATTR_APP_VERSION),
+        )
 
     # Register webhook handler
-    webhook_component.async_register(
-        hass,
-        DOMAIN,
-        f"Desktop App ({registration.get(ATTR_DEVICE_NAME, device_id)})",
-        webhook_id,
-        handle_webhook,
-        allowed_methods=["POST"],
-    )
+    with time_startup_phase(hass, "webhook_register"):
+        hass.data[DOMAIN][DATA_REVOKED_WEBHOOKS].async_forget(webhook_id)
+        webhook_component.async_register(
+            hass,
+            DOMAIN,
+            f"Desktop App ({registration.get(ATTR_DEVICE_NAME, device_id)})",
+            webhook_id,
+            handle_webhook,
+            allowed_methods=["POST"],
+        )
 
     # Initialize pending updates dict for this entry
     hass.data[DOMAIN][DATA_PENDING_UPDATES][webhook_id] = {}
 
+    # Start the heartbeat deadline; any webhook request from the device
+    # pushes it out again.
+    async_track_device_heartbeat(hass, registration)
+
     # Forward setup to sensor and binary_sensor platforms
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    with time_startup_phase(hass, "platform_setup", awaited=True):
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     _LOGGER.info("Desktop App entry set up for device: %s", device_id)
 
-    # Save store
-    await _async_save_store(hass)
+    if registration_changed:
+        _async_schedule_save_store(hass)
 
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply the hub options without a reload."""
+    hass.data[DOMAIN][DATA_OPTIONS] = dict(entry.options)
+
+    capture: TrafficCapture | None = hass.data[DOMAIN][DATA_CAPTURE]
+    if entry.options.get(CONF_CAPTURE_TRAFFIC) and capture is None:
+        capture = hass.data[DOMAIN][DATA_CAPTURE] = TrafficCapture(hass)
+        capture.async_start()
+    elif not entry.options.get(CONF_CAPTURE_TRAFFIC) and capture is not None:
+        hass.data[DOMAIN][DATA_CAPTURE] = None
+        await capture.async_stop()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a Desktop App config entry."""
-    # Hub entry — nothing to tear down
+    # Hub entry — only an active traffic capture to stop
     if entry.data.get("is_hub"):
+        if (capture := hass.data[DOMAIN][DATA_CAPTURE]) is not None:
+            hass.data[DOMAIN][DATA_CAPTURE] = None
+            await capture.async_stop()
         return True
 
     registration = entry.data
     webhook_id = registration.get(ATTR_WEBHOOK_ID)
 
+    if device_id := registration.get(ATTR_DEVICE_ID):
+        async_untrack_device_heartbeat(hass, device_id)
+        hass.data[DOMAIN][DATA_SENSOR_SEQUENCES].pop(device_id, None)
+        hass.data[DOMAIN][DATA_THROTTLE].async_forget(device_id)
+
     # Unregister webhook
     if webhook_id:
         webhook_component.async_unregister(hass, webhook_id)
@@ -161,17 +312,36 @@ async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
         deleted_ids = hass.data[DOMAIN][DATA_DELETED_IDS]
         if device_id not in deleted_ids:
             deleted_ids.append(device_id)
+        hass.data[DOMAIN][DATA_DELETED_AT][device_id] = time.time()
+        hass.data[DOMAIN][DATA_DEVICE_STATES].pop(device_id, None)
+        # The client may keep calling its webhook; tell it to stop
+        if webhook_id := entry.data.get(ATTR_WEBHOOK_ID):
+            hass.data[DOMAIN][DATA_REVOKED_WEBHOOKS].async_revoke(webhook_id)
         await _async_save_store(hass)
 
 
+def _store_data(hass: HomeAssistant) -> dict[str, Any]:
+    """Return the data persisted to the store."""
+    return {
+        DATA_CONFIG_ENTRIES: hass.data[DOMAIN][DATA_CONFIG_ENTRIES],
+        DATA_DEVICES: hass.data[DOMAIN][DATA_DEVICES],
+        DATA_DELETED_IDS: hass.data[DOMAIN][DATA_DELETED_IDS],
+        DATA_DELETED_AT: hass.data[DOMAIN][DATA_DELETED_AT],
+        DATA_REGISTERED_SENSORS: hass.data[DOMAIN].get(DATA_REGISTERED_SENSORS, {}),
+        DATA_SENSOR_LAST_SEEN: hass.data[DOMAIN][DATA_SENSOR_LAST_SEEN],
+        DATA_REVOKED_WEBHOOKS: hass.data[DOMAIN][DATA_REVOKED_WEBHOOKS].revoked_at(),
+    }
+
+
 async def _async_save_store(hass: HomeAssistant) -> None:
     """Save data to store."""
     store: Store = hass.data[DOMAIN][DATA_STORE]
-    await store.async_save(
-        {
-            DATA_CONFIG_ENTRIES: hass.data[DOMAIN][DATA_CONFIG_ENTRIES],
-            DATA_DEVICES: hass.data[DOMAIN][DATA_DEVICES],
-            DATA_DELETED_IDS: hass.data[DOMAIN][DATA_DELETED_IDS],
-            "registered_sensors": hass.data[DOMAIN].get("registered_sensors", {}),
-        }
-    )
+    with trace_stage(STAGE_STORE_SAVE):
+        await store.async_save(_store_data(hass))
+
+
+@callback
+def _async_schedule_save_store(hass: HomeAssistant) -> None:
+    """Schedule a coalesced store write; pending writes are flushed on shutdown."""
+    store: Store = hass.data[DOMAIN][DATA_STORE]
+    store.async_delay_save(lambda: _store_data(hass), STORAGE_SAVE_DELAY)
@@ -0,0 +1,112 @@
+"""Windowed aggregation of high-rate sensor samples."""
+
+from __future__ import annotations
+
+from array import array
+import math
+from typing import Any
+
+from .const import AGGREGATION_BUFFER_SIZE
+
+ATTR_MIN = "min"
+ATTR_MAX = "max"
+ATTR_MEAN = "mean"
+ATTR_LAST = "last"
+ATTR_SAMPLE_COUNT = "sample_count"
+ATTR_SAMPLES = "samples"
+
+AGGREGATION_STATISTICS = (ATTR_MIN, ATTR_MAX, ATTR_MEAN, ATTR_LAST)
+
+
+class SampleBuffer:
+    """Fixed-capacity ring buffer of float samples; the oldest are overwritten."""
+
+    __slots__ = ("_values", "_next", "_count")
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize the buffer."""
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return self._count
+
+    def append(self, value: float) -> None:
+        """Add a sample, overwriting the oldest one when full."""
+        values = self._values
+        values[self._next] = value
+        self._next = (self._next + 1) % len(values)
+        if self._count < len(values):
+            self._count += 1
+
+    def clear(self) -> None:
+        """Drop all samples."""
+        self._next = 0
+        self._count = 0
+
+    def to_list(self) -> list[float]:
+        """Return the samples, oldest first."""
+        values = self._values
+        start = (self._next - self._count) % len(values)
+        if start + self._count <= len(values):
+            return values[start : start + self._count].tolist()
+        return values[start:].tolist() + values[: self._next].tolist()
+
+
+class WindowAggregator:
+    """Collect samples for one window and summarize them when it closes.
+
+    min/max/mean/last are kept as running values, so they cover every sample
+    of the window even when the raw buffer has wrapped around.
+    """
+
+    __slots__ = ("_buffer", "_min", "_max", "_sum", "_count", "_last")
+
+    def __init__(self, capacity: int = AGGREGATION_BUFFER_SIZE) -> None:
+        """Initialize the aggregator."""
+        self._buffer = SampleBuffer(capacity)
+        self._reset()
+
+    def _reset(self) -> None:
+        """Start a new window."""
+        self._buffer.clear()
+        self._min = math.inf
+        self._max = -math.inf
+        self._sum = 0.0
+        self._count = 0
+        self._last = 0.0
+
+    def add(self, value: Any) -> bool:
+        """Add a sample; returns False when it is not a finite number."""
+        try:
+            sample = float(value)
+        except (TypeError, ValueError):
+            return False
+        if not math.isfinite(sample):
+            return False
+
+        self._buffer.append(sample)
+        self._min = min(self._min, sample)
+        self._max = max(self._max, sample)
+        self._sum += sample
+        self._count += 1
+        self._last = sample
+        return True
+
+    def flush(self) -> dict[str, Any] | None:
+        """Close the window and return its summary, or None if it was empty."""
+        if not self._count:
+            return None
+
+        summary = {
+            ATTR_MIN: self._min,
+            ATTR_MAX: self._max,
+            ATTR_MEAN: self._sum / self._count,
+            ATTR_LAST: self._last,
+            ATTR_SAMPLE_COUNT: self._count,
+            ATTR_SAMPLES: self._buffer.to_list(),
+        }
+        self._reset()
+        return summary
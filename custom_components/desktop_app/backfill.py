@@ -0,0 +1,105 @@
+"""Import offline sample backlogs into recorder long-term statistics."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_import_statistics
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import BACKFILL_CHUNK_SIZE, BACKFILL_MAX_CLOCK_SKEW
+
+try:
+    from homeassistant.components.recorder.models import StatisticMeanType
+except ImportError:  # Home Assistant < 2025.4
+    StatisticMeanType = None
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = 3600
+
+
+def newest_sample_time() -> float:
+    """Return the newest sample timestamp a backfill may carry.
+
+    There is no lower bound: long-term statistics are kept regardless of
+    the recorder's keep_days, so old samples are still worth importing.
+    """
+    return time.time() + BACKFILL_MAX_CLOCK_SKEW
+
+
+def hourly_statistics(
+    samples: list[list[float]], before: float
+) -> list[StatisticData]:
+    """Bucket (timestamp, value) samples into hourly min/max/mean rows.
+
+    Only hours that ended before the given timestamp are returned; the
+    recorder compiles the current hour itself from live states.
+    """
+    buckets: dict[int, list[float]] = {}
+    for timestamp, value in samples:
+        hour = int(timestamp // HOUR) * HOUR
+        if hour + HOUR > before:
+            continue
+        if (bucket := buckets.get(hour)) is None:
+            buckets[hour] = [value, value, value, 1]
+            continue
+        if value < bucket[0]:
+            bucket[0] = value
+        if value > bucket[1]:
+            bucket[1] = value
+        bucket[2] += value
+        bucket[3] += 1
+
+    return [
+        StatisticData(
+            start=dt_util.utc_from_timestamp(hour),
+            min=minimum,
+            max=maximum,
+            mean=total / count,
+        )
+        for hour, (minimum, maximum, total, count) in sorted(buckets.items())
+    ]
+
+
+async def async_import_backfill(
+    hass: HomeAssistant,
+    entity_id: str,
+    unit_of_measurement: str | None,
+    samples: list[list[float]],
+) -> int:
+    """Import a sample backlog as hourly statistics; returns the rows queued."""
+    rows = await hass.async_add_executor_job(hourly_statistics, samples, time.time())
+    if not rows:
+        return 0
+
+    metadata: dict[str, Any] = {
+        "has_mean": True,
+        "has_sum": False,
+        "name": None,
+        "source": "recorder",
+        "statistic_id": entity_id,
+        "unit_of_measurement": unit_of_measurement,
+    }
+    if StatisticMeanType is not None:
+        metadata["mean_type"] = StatisticMeanType.ARITHMETIC
+
+    # Each call queues one task on the recorder thread
+    for start in range(0, len(rows), BACKFILL_CHUNK_SIZE):
+        async_import_statistics(
+            hass,
+            StatisticMetaData(**metadata),
+            rows[start : start + BACKFILL_CHUNK_SIZE],
+        )
+
+    _LOGGER.debug(
+        "Queued %d hourly statistics rows from %d samples for %s",
+        len(rows),
+        len(samples),
+        entity_id,
+    )
+    return len(rows)
@@ -14,13 +14,13 @@ from homeassistant.helpers.entity_registry import async_get as async_get_entity_
 
 from .const import (
     ATTR_DEVICE_ID,
-    ATTR_SENSOR_STATE,
     ATTR_SENSOR_TYPE,
     ATTR_SENSOR_UNIQUE_ID,
-    DOMAIN,
     SIGNAL_SENSOR_REGISTER,
+    SIGNAL_SENSOR_REMOVE,
 )
 from .entity import DesktopAppEntity
+from .helpers import EntityAddBatcher, get_device_sensors, time_startup_phase
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -53,30 +53,40 @@ async def async_setup_entry(
     device_id = registration[ATTR_DEVICE_ID]
 
     # Track which unique_ids already have entities so we don't duplicate
-    known_unique_ids: set[str] = set()
-
-    # Restore existing binary sensor entities from entity registry
     entity_registry = async_get_entity_registry(hass)
-    existing_entities = []
-    registered_sensors = hass.data[DOMAIN].get("registered_sensors", {})
-
-    for entity_entry in entity_registry.entities.get_entries_for_config_entry_id(
-        entry.entry_id
-    ):
-        if entity_entry.domain != "binary_sensor":
-            continue
-
-        unique_id = entity_entry.unique_id
-        known_unique_ids.add(unique_id)
-        if unique_id in registered_sensors:
-            sensor_data = registered_sensors[unique_id]
-            existing_entities.append(
-                DesktopAppBinarySensor(hass, registration, sensor_data)
-            )
-            _LOGGER.debug("Restoring binary sensor entity: %s", unique_id)
+    known_unique_ids: set[str] = {
+        entity_entry.unique_id
+        for entity_entry in entity_registry.entities.get_entries_for_config_entry_id(
+            entry.entry_id
+        )
+        if entity_entry.domain == "binary_sensor"
+    }
+
+    # Create entities for every stored binary sensor of this device in a
+    # single batch. This covers both restored entities and sensors registered
+    # before platform setup completed (the desktop app may send
+    # register_sensor early); no await happens before the dispatcher
+    # listener below is connected, so nothing can slip in between.
+    with time_startup_phase(hass, "entity_build"):
+        entities = []
+        for key, sensor_data in get_device_sensors(hass, device_id).items():
+            if sensor_data.get(ATTR_SENSOR_TYPE) != "binary_sensor":
+                continue
+            known_unique_ids.add(key)
+            entities.append(DesktopAppBinarySensor(hass, registration, sensor_data))
+
+    if entities:
+        _LOGGER.debug(
+            "Creating %d binary sensor entities for device %s",
+            len(entities),
+            device_id,
+        )
+        async_add_entities(entities)
 
-    if existing_entities:
-        async_add_entities(existing_entities)
+    # Binary sensors registered at runtime arrive one signal each; add them
+    # in batches instead of one platform add cycle per binary sensor
+    batcher = EntityAddBatcher(hass, async_add_entities)
+    entry.async_on_unload(batcher.async_cancel)
 
     # Listen for new binary sensor registrations
     @callback
@@ -95,29 +105,22 @@ async def async_setup_entry(
             "Adding new binary sensor: %s",
             sensor_data.get(ATTR_SENSOR_UNIQUE_ID),
         )
-        async_add_entities(
-            [DesktopAppBinarySensor(hass, registration, sensor_data)]
-        )
+        batcher.async_add(DesktopAppBinarySensor(hass, registration, sensor_data))
 
     signal = SIGNAL_SENSOR_REGISTER.format(device_id, "binary_sensor")
     entry.async_on_unload(
         async_dispatcher_connect(hass, signal, _handle_sensor_register)
     )
 
-    # Check for sensors that were registered BEFORE the dispatcher listener
-    # was connected (race condition: desktop app sends register_sensor before
-    # platform setup completes).
-    new_entities = []
-    for key, sensor_data in registered_sensors.items():
-        if sensor_data.get(ATTR_DEVICE_ID) != device_id:
-            continue
-        if sensor_data.get(ATTR_SENSOR_TYPE) != "binary_sensor":
-            continue
-        if key in known_unique_ids:
-            continue
-        known_unique_ids.add(key)
-        _LOGGER.info("Creating binary sensor from pre-registered data: %s", key)
-        new_entities.append(DesktopAppBinarySensor(hass, registration, sensor_data))
-
-    if new_entities:
-        async_add_entities(new_entities)
+    @callback
+    def _handle_sensor_remove(unique_id: str) -> None:
+        """Forget a sensor purged by compaction so it can be registered again."""
+        known_unique_ids.discard(unique_id)
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_SENSOR_REMOVE.format(device_id, "binary_sensor"),
+            _handle_sensor_remove,
+        )
+    )
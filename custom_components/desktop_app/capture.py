@@ -0,0 +1,188 @@
+"""Opt-in capture of anonymized Desktop App traffic for replay benchmarks."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+from pathlib import Path
+import secrets
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    ATTR_DEVICE_ID,
+    ATTR_SENSOR_AGGREGATION_STATISTIC,
+    ATTR_SENSOR_DEVICE_CLASS,
+    ATTR_SENSOR_ENTITY_CATEGORY,
+    ATTR_SENSOR_ICON,
+    ATTR_SENSOR_STATE_CLASS,
+    ATTR_SENSOR_TYPE,
+    ATTR_SENSOR_UNIQUE_ID,
+    ATTR_SENSOR_UNIT_OF_MEASUREMENT,
+    ATTR_WEBHOOK_ID,
+    CAPTURE_BACKUP_COUNT,
+    CAPTURE_FILENAME,
+    CAPTURE_FLUSH_DELAY,
+    CAPTURE_MAX_BYTES,
+    COMMAND_REGISTER_SENSOR,
+    DATA_REGISTERED_SENSORS,
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SOURCE_SNAPSHOT = "snapshot"
+SOURCE_WEBHOOK = "webhook"
+SOURCE_RELAY = "relay"
+SOURCE_UPDATE = "update"
+
+# String values of these keys carry no personal data and shape how requests
+# are handled, so they are kept as sent
+KEEP_KEYS = {
+    "type",
+    ATTR_SENSOR_TYPE,
+    ATTR_SENSOR_ICON,
+    ATTR_SENSOR_DEVICE_CLASS,
+    ATTR_SENSOR_UNIT_OF_MEASUREMENT,
+    ATTR_SENSOR_STATE_CLASS,
+    ATTR_SENSOR_ENTITY_CATEGORY,
+    ATTR_SENSOR_AGGREGATION_STATISTIC,
+}
+# Identifiers are replaced by stable pseudonyms, so a replay still sends
+# the updates of one sensor to the same sensor
+PSEUDONYM_KEYS = {ATTR_SENSOR_UNIQUE_ID, ATTR_DEVICE_ID, ATTR_WEBHOOK_ID}
+
+
+class TrafficCapture:
+    """Write anonymized requests to a rotating JSONL file.
+
+    Requests are buffered on the event loop as they arrive and anonymized,
+    serialized and written in the executor once per flush delay.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the capture."""
+        self._hass = hass
+        self._path = Path(hass.config.path(CAPTURE_FILENAME))
+        # A new key per capture, so pseudonyms cannot be matched across
+        # captures
+        self._key = secrets.token_bytes(32)
+        self._buffer: list[tuple[float, str, str, str | None, Any]] = []
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @property
+    def path(self) -> Path:
+        """Return the path of the capture file."""
+        return self._path
+
+    @callback
+    def async_start(self) -> None:
+        """Record the stored sensor definitions so a replay can register them."""
+        now = time.time()
+        for sensor_data in self._hass.data[DOMAIN][DATA_REGISTERED_SENSORS].values():
+            definition = {
+                key: value
+                for key, value in sensor_data.items()
+                if key.startswith("sensor_") and value is not None
+            }
+            self._buffer.append(
+                (
+                    now,
+                    SOURCE_SNAPSHOT,
+                    sensor_data[ATTR_DEVICE_ID],
+                    COMMAND_REGISTER_SENSOR,
+                    {"type": COMMAND_REGISTER_SENSOR, "data": definition},
+                )
+            )
+        self._async_schedule_flush()
+        _LOGGER.warning("Capturing Desktop App traffic to %s", self._path)
+
+    @callback
+    def async_record(
+        self, source: str, device: str, command: str | None, body: Any
+    ) -> None:
+        """Queue a decoded request body for the capture file."""
+        self._buffer.append((time.time(), source, device, command, body))
+        self._async_schedule_flush()
+
+    @callback
+    def _async_schedule_flush(self) -> None:
+        """Flush the buffer after the flush delay."""
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, CAPTURE_FLUSH_DELAY, self._async_flush
+            )
+
+    async def _async_flush(self, _now: Any = None) -> None:
+        """Write the buffered requests in the executor."""
+        self._unsub_flush = None
+        records, self._buffer = self._buffer, []
+        if records:
+            await self._hass.async_add_executor_job(self._write, records)
+
+    async def async_stop(self) -> None:
+        """Write what is buffered and stop capturing."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+        await self._async_flush()
+        _LOGGER.warning("Stopped capturing Desktop App traffic")
+
+    def _pseudonym(self, value: str) -> str:
+        """Return a stable pseudonym for an identifier."""
+        return hmac.new(self._key, value.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def _anonymize(self, value: Any, key: str | None = None) -> Any:
+        """Mask string values, keeping the structure, types and lengths."""
+        if isinstance(value, dict):
+            return {
+                item_key: self._anonymize(item, item_key)
+                for item_key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self._anonymize(item, key) for item in value]
+        if not isinstance(value, str) or key in KEEP_KEYS:
+            return value
+        if key in PSEUDONYM_KEYS:
+            return self._pseudonym(value)
+        return "x" * len(value)
+
+    def _write(self, records: list[tuple[float, str, str, str | None, Any]]) -> None:
+        """Append records to the capture file, rotating it when full."""
+        lines = "".join(
+            json.dumps(
+                {
+                    "time": timestamp,
+                    "source": source,
+                    "device": self._pseudonym(device),
+                    "command": command,
+                    "body": self._anonymize(body),
+                },
+                separators=(",", ":"),
+            )
+            + "\n"
+            for timestamp, source, device, command, body in records
+        )
+        try:
+            if (
+                self._path.exists()
+                and self._path.stat().st_size + len(lines) > CAPTURE_MAX_BYTES
+            ):
+                self._rotate()
+            with self._path.open("a", encoding="utf-8") as capture_file:
+                capture_file.write(lines)
+        except OSError as err:
+            _LOGGER.error("Cannot write Desktop App capture: %s", err)
+
+    def _rotate(self) -> None:
+        """Shift capture.jsonl to capture.jsonl.1 and so on."""
+        for index in range(CAPTURE_BACKUP_COUNT - 1, 0, -1):
+            source = Path(f"{self._path}.{index}")
+            if source.exists():
+                os.replace(source, f"{self._path}.{index + 1}")
+        os.replace(self._path, f"{self._path}.1")
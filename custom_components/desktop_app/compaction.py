@@ -0,0 +1,300 @@
+"""Purge stale sensors, tombstones and other leftovers of removed devices."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.service import async_register_admin_service
+
+from .const import (
+    ATTR_DEVICE_ID,
+    ATTR_DRY_RUN,
+    ATTR_SENSOR_RETENTION_DAYS,
+    ATTR_SENSOR_TYPE,
+    ATTR_SENSOR_UNIQUE_ID,
+    ATTR_TOMBSTONE_RETENTION_DAYS,
+    ATTR_WEBHOOK_ID,
+    COMPACTION_INTERVAL,
+    DATA_CONFIG_ENTRIES,
+    DATA_DELETED_AT,
+    DATA_DELETED_IDS,
+    DATA_DEVICE_STATES,
+    DATA_DEVICES,
+    DATA_LAST_COMPACTION,
+    DATA_PENDING_UPDATES,
+    DATA_REGISTERED_SENSORS,
+    DATA_REQUEST_STATS,
+    DATA_REVOKED_WEBHOOKS,
+    DATA_SENSOR_LAST_SEEN,
+    DATA_SENSOR_SEQUENCES,
+    DATA_SENSORS_BY_DEVICE,
+    DATA_UNAVAILABLE_DEVICES,
+    DEFAULT_SENSOR_RETENTION_DAYS,
+    DEFAULT_TOMBSTONE_RETENTION_DAYS,
+    DOMAIN,
+    SERVICE_COMPACT,
+    SIGNAL_SENSOR_REMOVE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DAY = 86400
+
+COMPACT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(
+            ATTR_SENSOR_RETENTION_DAYS, default=DEFAULT_SENSOR_RETENTION_DAYS
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(
+            ATTR_TOMBSTONE_RETENTION_DAYS, default=DEFAULT_TOMBSTONE_RETENTION_DAYS
+        ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(ATTR_DRY_RUN, default=False): bool,
+    }
+)
+
+
+@callback
+def async_setup_compaction(hass: HomeAssistant) -> None:
+    """Register the compact service and run compaction once a day."""
+
+    async def _async_compact_service(call: ServiceCall) -> ServiceResponse:
+        """Run compaction on demand and return what was reclaimed."""
+        return await async_compact(
+            hass,
+            sensor_retention=call.data[ATTR_SENSOR_RETENTION_DAYS] * DAY,
+            tombstone_retention=call.data[ATTR_TOMBSTONE_RETENTION_DAYS] * DAY,
+            dry_run=call.data[ATTR_DRY_RUN],
+        )
+
+    async def _async_compact_periodic(_now: datetime) -> None:
+        """Run compaction with the default retention."""
+        await async_compact(hass)
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_COMPACT,
+        _async_compact_service,
+        schema=COMPACT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    async_track_time_interval(
+        hass,
+        _async_compact_periodic,
+        COMPACTION_INTERVAL,
+        name=f"{DOMAIN} compaction",
+        cancel_on_shutdown=True,
+    )
+
+
+async def async_compact(
+    hass: HomeAssistant,
+    sensor_retention: float = DEFAULT_SENSOR_RETENTION_DAYS * DAY,
+    tombstone_retention: float = DEFAULT_TOMBSTONE_RETENTION_DAYS * DAY,
+    dry_run: bool = False,
+) -> dict[str, Any]:
+    """Purge data no live device needs anymore and report what was reclaimed.
+
+    A sensor definition is orphaned when its device has no config entry, and
+    stale when its device has not registered or updated it for the retention
+    period while still sending other sensors. Staleness is measured against
+    the device's newest activity, so a device that was switched off for a
+    long time keeps all its sensors. Entity registry entries without a definition, copies
+    of removed config entries, expired tombstones and per-device bookkeeping
+    of unknown devices are purged as well.
+    """
+    domain_data = hass.data[DOMAIN]
+    now = time.time()
+
+    device_entries = {
+        entry.entry_id: entry.data[ATTR_DEVICE_ID]
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if ATTR_DEVICE_ID in entry.data
+    }
+    known_device_ids = set(device_entries.values())
+
+    # Sensor definitions
+    registered_sensors: dict[str, dict[str, Any]] = domain_data[
+        DATA_REGISTERED_SENSORS
+    ]
+    last_seen: dict[str, float] = domain_data[DATA_SENSOR_LAST_SEEN]
+    device_activity: dict[str, float] = {}
+    for key, sensor_data in registered_sensors.items():
+        device_id = sensor_data.get(ATTR_DEVICE_ID)
+        seen = last_seen.get(key, now)
+        if seen > device_activity.get(device_id, 0):
+            device_activity[device_id] = seen
+    orphaned_sensors: list[str] = []
+    stale_sensors: list[str] = []
+    for key, sensor_data in registered_sensors.items():
+        device_id = sensor_data.get(ATTR_DEVICE_ID)
+        if device_id not in known_device_ids:
+            orphaned_sensors.append(key)
+        elif (
+            device_activity[device_id] - last_seen.get(key, now) > sensor_retention
+        ):
+            stale_sensors.append(key)
+    purged_sensors = {*orphaned_sensors, *stale_sensors}
+
+    # Entity registry entries of this integration without a definition, or
+    # without a config entry of this integration
+    entity_registry = er.async_get(hass)
+    registry_entities = [
+        entity_entry.entity_id
+        for entity_entry in list(entity_registry.entities.values())
+        if entity_entry.platform == DOMAIN
+        and (
+            entity_entry.config_entry_id not in device_entries
+            or entity_entry.unique_id not in registered_sensors
+            or entity_entry.unique_id in purged_sensors
+        )
+    ]
+
+    # Stored copies of config entries that no longer exist
+    config_entries: dict[str, dict[str, Any]] = domain_data[DATA_CONFIG_ENTRIES]
+    removed_entries = [
+        entry_id for entry_id in config_entries if entry_id not in device_entries
+    ]
+
+    # Tombstones expire after the retention period, or as soon as the device
+    # registers again. Tombstones from before timestamps were kept start
+    # their retention period now.
+    deleted_ids: list[str] = domain_data[DATA_DELETED_IDS]
+    deleted_at: dict[str, float] = domain_data[DATA_DELETED_AT]
+    tombstones = [
+        device_id
+        for device_id in deleted_ids
+        if device_id in known_device_ids
+        or now - deleted_at.get(device_id, now) > tombstone_retention
+    ]
+
+    devices = [
+        device_id
+        for device_id in domain_data[DATA_DEVICES]
+        if device_id not in known_device_ids
+    ]
+
+    report: dict[str, Any] = {
+        "orphaned_sensors": len(orphaned_sensors),
+        "stale_sensors": len(stale_sensors),
+        "registry_entities": len(registry_entities),
+        "config_entries": len(removed_entries),
+        "tombstones": len(tombstones),
+        "devices": len(devices),
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        return report
+
+    for entity_id in registry_entities:
+        entity_registry.async_remove(entity_id)
+
+    for entry_id in removed_entries:
+        del config_entries[entry_id]
+    webhook_ids = {
+        entry_data.get(ATTR_DEVICE_ID): entry_data.get(ATTR_WEBHOOK_ID)
+        for entry_data in config_entries.values()
+    }
+    pending_by_webhook: dict[str, dict[str, Any]] = domain_data[DATA_PENDING_UPDATES]
+    sequences: dict[str, dict[str, float]] = domain_data[DATA_SENSOR_SEQUENCES]
+    sensors_by_device = domain_data[DATA_SENSORS_BY_DEVICE]
+    device_states = domain_data[DATA_DEVICE_STATES]
+    for key in purged_sensors:
+        sensor_data = registered_sensors.pop(key)
+        last_seen.pop(key, None)
+        device_id = sensor_data.get(ATTR_DEVICE_ID)
+        if (device_sensors := sensors_by_device.get(device_id)) is not None:
+            device_sensors.pop(key, None)
+            if not device_sensors:
+                del sensors_by_device[device_id]
+        if (pending := pending_by_webhook.get(webhook_ids.get(device_id))) is not None:
+            pending.pop(key, None)
+        if (device_sequences := sequences.get(device_id)) is not None:
+            device_sequences.pop(sensor_data.get(ATTR_SENSOR_UNIQUE_ID), None)
+        if (state_index := device_states.get(device_id)) is not None:
+            state_index.remove(sensor_data.get(ATTR_SENSOR_UNIQUE_ID))
+        # Lets the platform accept the sensor again if it is re-registered
+        async_dispatcher_send(
+            hass,
+            SIGNAL_SENSOR_REMOVE.format(device_id, sensor_data.get(ATTR_SENSOR_TYPE)),
+            key,
+        )
+
+    expired = set(tombstones)
+    deleted_ids[:] = [
+        device_id for device_id in deleted_ids if device_id not in expired
+    ]
+    for device_id in list(deleted_at):
+        if device_id not in deleted_ids:
+            del deleted_at[device_id]
+    for device_id in deleted_ids:
+        deleted_at.setdefault(device_id, now)
+
+    for device_id in devices:
+        del domain_data[DATA_DEVICES][device_id]
+
+    report["revoked_webhooks"] = domain_data[DATA_REVOKED_WEBHOOKS].async_expire(
+        now - tombstone_retention
+    )
+
+    # In-memory bookkeeping that is never persisted
+    for key in [key for key in last_seen if key not in registered_sensors]:
+        del last_seen[key]
+    live_webhook_ids = set(webhook_ids.values())
+    report["pending_updates"] = 0
+    for webhook_id, pending in list(pending_by_webhook.items()):
+        if webhook_id not in live_webhook_ids:
+            del pending_by_webhook[webhook_id]
+            report["pending_updates"] += len(pending)
+            continue
+        for key in [key for key in pending if key not in registered_sensors]:
+            del pending[key]
+            report["pending_updates"] += 1
+    for device_id, device_sequences in sequences.items():
+        for sensor_unique_id in [
+            sensor_unique_id
+            for sensor_unique_id in device_sequences
+            if f"{device_id}_{sensor_unique_id}" not in registered_sensors
+        ]:
+            del device_sequences[sensor_unique_id]
+    request_stats = domain_data[DATA_REQUEST_STATS]["devices"]
+    for bookkeeping in (sequences, request_stats, device_states):
+        for device_id in [key for key in bookkeeping if key not in known_device_ids]:
+            del bookkeeping[device_id]
+    domain_data[DATA_UNAVAILABLE_DEVICES].intersection_update(known_device_ids)
+
+    # Also persists the sensor last-seen times, which updates alone never do
+    from . import _async_save_store
+    await _async_save_store(hass)
+
+    report["time"] = now
+    domain_data[DATA_LAST_COMPACTION] = report
+    _LOGGER.info(
+        "Desktop App compaction reclaimed %d orphaned and %d stale sensors, "
+        "%d registry entities, %d config entry copies, %d tombstones, "
+        "%d revoked webhooks, %d devices and %d pending updates",
+        report["orphaned_sensors"],
+        report["stale_sensors"],
+        report["registry_entities"],
+        report["config_entries"],
+        report["tombstones"],
+        report["revoked_webhooks"],
+        report["devices"],
+        report["pending_updates"],
+    )
+    return report
@@ -5,11 +5,26 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+import voluptuous as vol
+
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
+from homeassistant.core import callback
 
 from .const import (
     ATTR_DEVICE_ID,
     ATTR_DEVICE_NAME,
+    CONF_BURST_SIZE,
+    CONF_CAPTURE_TRAFFIC,
+    CONF_SLOW_REQUEST_THRESHOLD,
+    CONF_SUSTAINED_RATE,
+    DEFAULT_BURST_SIZE,
+    DEFAULT_SLOW_REQUEST_THRESHOLD,
+    DEFAULT_SUSTAINED_RATE,
     DOMAIN,
 )
 
@@ -21,6 +36,18 @@ class DesktopAppConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Return the options flow for the hub entry."""
+        return DesktopAppOptionsFlow()
+
+    @classmethod
+    @callback
+    def async_supports_options_flow(cls, config_entry: ConfigEntry) -> bool:
+        """Only the hub entry has options; device entries are managed by the app."""
+        return bool(config_entry.data.get("is_hub"))
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
@@ -61,3 +88,44 @@ class DesktopAppConfigFlow(ConfigFlow, domain=DOMAIN):
             title=device_name,
             data=registration_data,
         )
+
+
+class DesktopAppOptionsFlow(OptionsFlow):
+    """Handle the hub options for Desktop App."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the hub options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.hass.config_entries.async_get_entry(self.handler).options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_SLOW_REQUEST_THRESHOLD,
+                        default=options.get(
+                            CONF_SLOW_REQUEST_THRESHOLD,
+                            DEFAULT_SLOW_REQUEST_THRESHOLD,
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60000)),
+                    vol.Required(
+                        CONF_SUSTAINED_RATE,
+                        default=options.get(
+                            CONF_SUSTAINED_RATE, DEFAULT_SUSTAINED_RATE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100000)),
+                    vol.Required(
+                        CONF_BURST_SIZE,
+                        default=options.get(CONF_BURST_SIZE, DEFAULT_BURST_SIZE),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000000)),
+                    vol.Required(
+                        CONF_CAPTURE_TRAFFIC,
+                        default=options.get(CONF_CAPTURE_TRAFFIC, False),
+                    ): bool,
+                }
+            ),
+        )
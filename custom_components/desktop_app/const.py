@@ -1,10 +1,14 @@
 """Constants for the Desktop App integration."""
 
+from datetime import timedelta
+
 DOMAIN = "desktop_app"
 
 # Storage
 STORAGE_KEY = "desktop_app_registrations"
 STORAGE_VERSION = 1
+# Seconds to coalesce non-critical store writes (flushed on HA shutdown)
+STORAGE_SAVE_DELAY = 10
 
 # Data keys
 DATA_CONFIG_ENTRIES = "config_entries"
@@ -15,6 +19,24 @@ DATA_STORE = "store"
 DATA_API_VIEW_REGISTERED = "api_view_registered"
 DATA_BINARY_SENSOR = "binary_sensor"
 DATA_SENSOR = "sensor"
+DATA_REGISTERED_SENSORS = "registered_sensors"
+DATA_SENSORS_BY_DEVICE = "sensors_by_device"
+DATA_STARTUP_TIMINGS = "startup_timings"
+DATA_STARTUP_SPAN_STARTS = "startup_span_starts"
+DATA_EXPIRY_SCHEDULER = "expiry_scheduler"
+DATA_UNAVAILABLE_DEVICES = "unavailable_devices"
+DATA_SENSOR_SEQUENCES = "sensor_sequences"
+DATA_REJECTIONS = "rejections"
+DATA_PROFILER = "profiler"
+DATA_OPTIONS = "options"
+DATA_REQUEST_STATS = "request_stats"
+DATA_SENSOR_LAST_SEEN = "sensor_last_seen"
+DATA_DELETED_AT = "deleted_at"
+DATA_LAST_COMPACTION = "last_compaction"
+DATA_DEVICE_STATES = "device_states"
+DATA_REVOKED_WEBHOOKS = "revoked_webhooks"
+DATA_CAPTURE = "capture"
+DATA_THROTTLE = "throttle"
 
 # Device attributes
 ATTR_DEVICE_ID = "device_id"
@@ -24,9 +46,13 @@ ATTR_MODEL = "model"
 ATTR_OS_NAME = "os_name"
 ATTR_OS_VERSION = "os_version"
 ATTR_APP_VERSION = "app_version"
+ATTR_HEARTBEAT_TIMEOUT = "heartbeat_timeout"
 
 # Webhook
 ATTR_WEBHOOK_ID = "webhook_id"
+# Optional monotonically increasing number (counter or client timestamp) on
+# update_sensor_states, used to drop updates that arrive out of order
+ATTR_SEQUENCE = "sequence"
 
 # Sensor attributes
 ATTR_SENSOR_TYPE = "sensor_type"
@@ -39,11 +65,99 @@ ATTR_SENSOR_DEVICE_CLASS = "sensor_device_class"
 ATTR_SENSOR_UNIT_OF_MEASUREMENT = "sensor_unit_of_measurement"
 ATTR_SENSOR_STATE_CLASS = "sensor_state_class"
 ATTR_SENSOR_ENTITY_CATEGORY = "sensor_entity_category"
+ATTR_SENSOR_EXPIRE_AFTER = "sensor_expire_after"
+ATTR_SENSOR_AGGREGATION_WINDOW = "sensor_aggregation_window"
+ATTR_SENSOR_AGGREGATION_STATISTIC = "sensor_aggregation_statistic"
+ATTR_SENSOR_SAMPLES = "sensor_samples"
+# Fingerprint of a stored register_sensor body, and of a device's sensor set
+# as sent with a registration
+ATTR_DEFINITION_HASH = "definition_hash"
+ATTR_SENSORS_HASH = "sensors_hash"
+ATTR_SENSORS_MATCH = "sensors_match"
+
+# Availability: a device that sends nothing for this many seconds is marked
+# unavailable (0 disables). Off unless the device sets it at registration,
+# so clients that do not send heartbeats are never marked unavailable.
+DEFAULT_HEARTBEAT_TIMEOUT = 0
+EXPIRY_TICK_INTERVAL = timedelta(seconds=1)
+
+# Entities registered at runtime are collected for this many seconds and then
+# added to their platform in one call
+ENTITY_ADD_DELAY = 0.5
+
+# Aggregation: raw samples kept per window for the "samples" attribute
+AGGREGATION_BUFFER_SIZE = 600
+MIN_AGGREGATION_WINDOW = 1
+
+# Payload limits, checked before anything is dispatched
+MAX_WEBHOOK_BODY_SIZE = 8 * 1024 * 1024
+MAX_SENSORS_PER_REQUEST = 1000
+MAX_RELAY_BATCHES = 500
+MAX_STRING_LENGTH = 255
+MAX_STATE_LENGTH = 255
+MAX_ATTRIBUTE_DEPTH = 4
+MAX_ATTRIBUTE_ITEMS = 500
+MAX_BACKFILL_SAMPLES = 200_000
+
+# Request bodies at least this large are JSON-decoded in the executor so a
+# multi-megabyte batch does not block the event loop; smaller ones are
+# cheaper to decode inline than to hand off to a thread
+EXECUTOR_JSON_THRESHOLD = 256 * 1024
+
+# Backfill: hourly statistics rows per recorder import task
+BACKFILL_CHUNK_SIZE = 1000
+# Backfill samples may be this many seconds ahead of the server clock
+BACKFILL_MAX_CLOCK_SKEW = 300
+
+# Compaction: sensors not registered or updated for this long are purged,
+# as are tombstones of removed devices
+DEFAULT_SENSOR_RETENTION_DAYS = 30
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 90
+COMPACTION_INTERVAL = timedelta(days=1)
+
+# Webhooks of removed devices answer 410 with a Retry-After that doubles
+# from the minimum up to the maximum (seconds)
+MAX_REVOKED_WEBHOOKS = 1000
+REVOKED_RETRY_AFTER_MIN = 60
+REVOKED_RETRY_AFTER_MAX = 86400
 
 # Webhook command types
 COMMAND_REGISTER_SENSOR = "register_sensor"
 COMMAND_UPDATE_SENSOR_STATES = "update_sensor_states"
 COMMAND_UPDATE_REGISTRATION = "update_registration"
+COMMAND_BACKFILL_SENSOR_STATES = "backfill_sensor_states"
+
+# Options (set on the hub entry)
+CONF_SLOW_REQUEST_THRESHOLD = "slow_request_threshold"
+DEFAULT_SLOW_REQUEST_THRESHOLD = 500  # milliseconds
+CONF_CAPTURE_TRAFFIC = "capture_traffic"
+CONF_SUSTAINED_RATE = "sustained_rate"
+CONF_BURST_SIZE = "burst_size"
+
+# Per-device budgets: sensor values a device may send per second on average,
+# and at once after a quiet period. A request costs one token per sensor it
+# carries, backfills included, at least one. The default burst fits a full
+# update batch.
+DEFAULT_SUSTAINED_RATE = 100
+DEFAULT_BURST_SIZE = 2000
+
+# Traffic capture: anonymized requests in <config>/desktop_app_capture.jsonl,
+# rotated like a log file and written once per flush delay (seconds)
+CAPTURE_FILENAME = f"{DOMAIN}_capture.jsonl"
+CAPTURE_MAX_BYTES = 50 * 1024 * 1024
+CAPTURE_BACKUP_COUNT = 3
+CAPTURE_FLUSH_DELAY = 1
+
+# Request tracing: slow requests kept for diagnostics
+SLOW_REQUEST_HISTORY = 50
+
+# Services
+SERVICE_START_PROFILE = "start_profile"
+SERVICE_COMPACT = "compact"
+ATTR_DURATION = "duration"
+ATTR_SENSOR_RETENTION_DAYS = "sensor_retention_days"
+ATTR_TOMBSTONE_RETENTION_DAYS = "tombstone_retention_days"
+ATTR_DRY_RUN = "dry_run"
 
 # API update event (fired by POST /api/desktop_app/update)
 EVENT_DESKTOP_APP_UPDATE = "desktop_app_update_event"
@@ -51,6 +165,8 @@ EVENT_DESKTOP_APP_UPDATE = "desktop_app_update_event"
 # Signal templates
 SIGNAL_SENSOR_UPDATE = f"{DOMAIN}_sensor_update_{{}}_{{}}"
 SIGNAL_SENSOR_REGISTER = f"{DOMAIN}_sensor_register_{{}}_{{}}"
+SIGNAL_SENSOR_REMOVE = f"{DOMAIN}_sensor_remove_{{}}_{{}}"
+SIGNAL_DEVICE_AVAILABILITY = f"{DOMAIN}_device_availability_{{}}"
 
 # Platforms
 PLATFORMS = ["sensor", "binary_sensor"]
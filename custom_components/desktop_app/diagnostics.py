@@ -0,0 +1,155 @@
+"""Diagnostics support for Desktop App."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import tracemalloc
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import DATA_DISPATCHER
+
+from .const import (
+    ATTR_DEVICE_ID,
+    ATTR_WEBHOOK_ID,
+    DATA_CONFIG_ENTRIES,
+    DATA_DELETED_IDS,
+    DATA_DEVICE_STATES,
+    DATA_EXPIRY_SCHEDULER,
+    DATA_LAST_COMPACTION,
+    DATA_PENDING_UPDATES,
+    DATA_REGISTERED_SENSORS,
+    DATA_REJECTIONS,
+    DATA_REQUEST_STATS,
+    DATA_REVOKED_WEBHOOKS,
+    DATA_SENSOR_LAST_SEEN,
+    DATA_SENSOR_SEQUENCES,
+    DATA_STARTUP_TIMINGS,
+    DATA_THROTTLE,
+    DOMAIN,
+)
+
+TO_REDACT = {ATTR_WEBHOOK_ID}
+
+PACKAGE_PATH = Path(__file__).parent
+TRACEMALLOC_TOP_LINES = 10
+
+
+def _command_stats(command_stats: dict[str, Any]) -> dict[str, Any]:
+    """Express the accumulated stats of one command in milliseconds."""
+    count = command_stats["count"]
+    return {
+        "count": count,
+        "mean_ms": round(command_stats["total"] * 1000 / count, 2),
+        "max_ms": round(command_stats["max"] * 1000, 2),
+        "stages_mean_ms": {
+            name: round(seconds * 1000 / count, 2)
+            for name, seconds in command_stats["stages"].items()
+        },
+    }
+
+
+def _device_stats(device_stats: dict[str, Any]) -> dict[str, Any]:
+    """Return the request stats of one device."""
+    return {
+        command: _command_stats(command_stats)
+        for command, command_stats in device_stats.items()
+    }
+
+
+def _traced_memory() -> dict[str, Any] | None:
+    """Return the traced memory allocated by this package's code.
+
+    Only available when Home Assistant runs with tracemalloc enabled, for
+    example with PYTHONTRACEMALLOC=1 in its environment.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(True, str(PACKAGE_PATH / "*")),)
+    )
+    by_line = snapshot.statistics("lineno")
+    return {
+        "bytes": sum(stat.size for stat in by_line),
+        "blocks": sum(stat.count for stat in by_line),
+        "top_lines": [
+            {
+                "line": f"{Path(frame.filename).name}:{frame.lineno}",
+                "bytes": stat.size,
+                "blocks": stat.count,
+            }
+            for stat in by_line[:TRACEMALLOC_TOP_LINES]
+            for frame in stat.traceback[:1]
+        ],
+    }
+
+
+async def _async_memory_usage(hass: HomeAssistant) -> dict[str, Any]:
+    """Return the size of every structure the integration keeps in memory."""
+    domain_data = hass.data[DOMAIN]
+    dispatcher = hass.data.get(DATA_DISPATCHER, {})
+    return {
+        "devices": len(domain_data[DATA_CONFIG_ENTRIES]),
+        "registered_sensors": len(domain_data[DATA_REGISTERED_SENSORS]),
+        "sensor_last_seen": len(domain_data[DATA_SENSOR_LAST_SEEN]),
+        "pending_updates": sum(
+            len(pending) for pending in domain_data[DATA_PENDING_UPDATES].values()
+        ),
+        "sensor_sequences": sum(
+            len(sequences)
+            for sequences in domain_data[DATA_SENSOR_SEQUENCES].values()
+        ),
+        "state_index_sensors": sum(
+            len(state_index) for state_index in domain_data[DATA_DEVICE_STATES].values()
+        ),
+        "tombstones": len(domain_data[DATA_DELETED_IDS]),
+        "revoked_webhooks": len(domain_data[DATA_REVOKED_WEBHOOKS]),
+        "device_budgets": len(domain_data[DATA_THROTTLE]),
+        "scheduled_keys": len(domain_data[DATA_EXPIRY_SCHEDULER]),
+        "dispatcher_listeners": sum(
+            len(targets)
+            for signal, targets in dispatcher.items()
+            # Core also keys the dispatcher by SignalType objects
+            if isinstance(signal, str) and signal.startswith(DOMAIN)
+        ),
+        "traced": await hass.async_add_executor_job(_traced_memory),
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    domain_data = hass.data[DOMAIN]
+    request_stats = domain_data[DATA_REQUEST_STATS]
+
+    if entry.data.get("is_hub"):
+        return {
+            "options": dict(entry.options),
+            "startup_timings": domain_data[DATA_STARTUP_TIMINGS],
+            "rejections": domain_data[DATA_REJECTIONS],
+            "revoked_webhook_requests": domain_data[DATA_REVOKED_WEBHOOKS].hits,
+            "requests": {
+                device_id: _device_stats(device_stats)
+                for device_id, device_stats in request_stats["devices"].items()
+            },
+            "slow_requests": list(request_stats["slow_requests"]),
+            "budgets": domain_data[DATA_THROTTLE].diagnostics(),
+            "last_compaction": domain_data.get(DATA_LAST_COMPACTION),
+            "memory": await _async_memory_usage(hass),
+        }
+
+    device_id = entry.data[ATTR_DEVICE_ID]
+    return {
+        "registration": async_redact_data(dict(entry.data), TO_REDACT),
+        "requests": _device_stats(request_stats["devices"].get(device_id, {})),
+        "slow_requests": [
+            slow_request
+            for slow_request in request_stats["slow_requests"]
+            if slow_request["device_id"] == device_id
+        ],
+        "budget": domain_data[DATA_THROTTLE].diagnostics(device_id),
+    }
@@ -9,11 +9,15 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.restore_state import RestoreEntity
 
+from .aggregation import ATTR_MEAN, ATTR_SAMPLES, WindowAggregator
 from .const import (
     ATTR_DEVICE_ID,
+    ATTR_SENSOR_AGGREGATION_STATISTIC,
+    ATTR_SENSOR_AGGREGATION_WINDOW,
     ATTR_SENSOR_ATTRIBUTES,
     ATTR_SENSOR_DEVICE_CLASS,
     ATTR_SENSOR_ENTITY_CATEGORY,
+    ATTR_SENSOR_EXPIRE_AFTER,
     ATTR_SENSOR_ICON,
     ATTR_SENSOR_NAME,
     ATTR_SENSOR_STATE,
@@ -21,10 +25,14 @@ from .const import (
     ATTR_SENSOR_UNIQUE_ID,
     ATTR_SENSOR_UNIT_OF_MEASUREMENT,
     ATTR_WEBHOOK_ID,
+    DATA_EXPIRY_SCHEDULER,
     DATA_PENDING_UPDATES,
+    DATA_UNAVAILABLE_DEVICES,
     DOMAIN,
+    SIGNAL_DEVICE_AVAILABILITY,
     SIGNAL_SENSOR_UPDATE,
 )
+from .tracing import STAGE_STATE_WRITE, trace_stage
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +42,8 @@ class DesktopAppEntity(RestoreEntity):
 
     _attr_should_poll = False
     _attr_has_entity_name = True
+    # Raw window samples are for live inspection, not for the recorder
+    _unrecorded_attributes = frozenset({ATTR_SAMPLES})
 
     def __init__(
         self,
@@ -53,6 +63,15 @@ class DesktopAppEntity(RestoreEntity):
         self._device_id = device_id
         self._sensor_unique_id = sensor_unique_id
         self._webhook_id = config_entry_data.get(ATTR_WEBHOOK_ID)
+        self._expire_after = sensor_data.get(ATTR_SENSOR_EXPIRE_AFTER)
+        self._expired = False
+
+        # Aggregated sensors buffer samples and publish once per window
+        self._aggregation_window = sensor_data.get(ATTR_SENSOR_AGGREGATION_WINDOW)
+        self._aggregation_statistic = (
+            sensor_data.get(ATTR_SENSOR_AGGREGATION_STATISTIC) or ATTR_MEAN
+        )
+        self._aggregator = WindowAggregator() if self._aggregation_window else None
 
         # Set optional attributes (default icon for desktop app entities)
         self._attr_icon = sensor_data.get(ATTR_SENSOR_ICON) or "mdi:desktop-tower-monitor"
@@ -85,12 +104,33 @@ class DesktopAppEntity(RestoreEntity):
             "identifiers": {(DOMAIN, self._device_id)},
         }
 
+    @property
+    def available(self) -> bool:
+        """Return False when the device missed its heartbeat or the value expired."""
+        return not self._expired and (
+            self._device_id not in self.hass.data[DOMAIN][DATA_UNAVAILABLE_DEVICES]
+        )
+
     async def async_added_to_hass(self) -> None:
         """Handle entity added to hass."""
         await super().async_added_to_hass()
 
-        # Restore previous state if available
-        if (last_state := await self.async_get_last_state()) is not None:
+        # The stored definition keeps the last value the device sent, which
+        # __init__ already applied, so the restore cache is only needed for
+        # sensors without one. Aggregated sensors publish a statistic rather
+        # than the last sample and always restore. A buffered update is
+        # newer than either.
+        pending = self.hass.data[DOMAIN][DATA_PENDING_UPDATES].get(
+            self._webhook_id, {}
+        )
+        if (
+            self._attr_unique_id not in pending
+            and (
+                self._aggregator is not None
+                or self._sensor_data.get(ATTR_SENSOR_STATE) is None
+            )
+            and (last_state := await self.async_get_last_state()) is not None
+        ):
             self._handle_restore(last_state)
 
         # Connect dispatcher listener for updates
@@ -100,20 +140,49 @@ class DesktopAppEntity(RestoreEntity):
         self.async_on_remove(
             async_dispatcher_connect(self.hass, signal, self._handle_update)
         )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DEVICE_AVAILABILITY.format(self._device_id),
+                self.async_write_ha_state,
+            )
+        )
+
+        # Expire the value if the device stops reporting this sensor
+        scheduler = self.hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER]
+        if self._expire_after:
+            expire_key = ("expire", self._attr_unique_id)
+            scheduler.async_track(
+                expire_key, self._expire_after, self._handle_expired
+            )
+            self.async_on_remove(lambda: scheduler.async_untrack(expire_key))
+
+        # Publish aggregated samples on a fixed cadence
+        if self._aggregator is not None:
+            self._async_schedule_window()
+            self.async_on_remove(
+                lambda: scheduler.async_untrack(("window", self._attr_unique_id))
+            )
 
         # Apply any pending updates
-        pending = self.hass.data[DOMAIN][DATA_PENDING_UPDATES].get(
-            self._webhook_id, {}
-        )
-        unique_store_key = f"{self._device_id}_{self._sensor_unique_id}"
-        if unique_store_key in pending:
-            self._handle_update(pending.pop(unique_store_key))
+        if (pending_update := pending.pop(self._attr_unique_id, None)) is not None:
+            self._handle_update(pending_update)
 
     @callback
     def _handle_update(self, update_data: dict[str, Any]) -> None:
         """Handle a sensor state update."""
+        # The update only had to be buffered until this entity existed;
+        # keeping it would hold a copy of every sensor's last payload
+        self.hass.data[DOMAIN][DATA_PENDING_UPDATES].get(self._webhook_id, {}).pop(
+            self._attr_unique_id, None
+        )
+
+        aggregating = self._aggregator is not None
         if ATTR_SENSOR_STATE in update_data:
-            self._update_state(update_data[ATTR_SENSOR_STATE])
+            if aggregating:
+                self._aggregator.add(update_data[ATTR_SENSOR_STATE])
+            else:
+                self._update_state(update_data[ATTR_SENSOR_STATE])
 
         if ATTR_SENSOR_ICON in update_data and update_data[ATTR_SENSOR_ICON]:
             self._attr_icon = update_data[ATTR_SENSOR_ICON]
@@ -121,6 +190,47 @@ class DesktopAppEntity(RestoreEntity):
         if ATTR_SENSOR_ATTRIBUTES in update_data:
             self._attr_extra_state_attributes = update_data[ATTR_SENSOR_ATTRIBUTES]
 
+        if self._expire_after:
+            self.hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER].async_touch(
+                ("expire", self._attr_unique_id)
+            )
+            if self._expired:
+                # Come back right away rather than at the end of the window
+                self._expired = False
+                aggregating = False
+
+        # Aggregated sensors only write state when their window closes
+        if not aggregating:
+            with trace_stage(STAGE_STATE_WRITE):
+                self.async_write_ha_state()
+
+    @callback
+    def _handle_expired(self) -> None:
+        """Mark the entity unavailable after expire_after without an update."""
+        self._expired = True
+        self.async_write_ha_state()
+
+    @callback
+    def _async_schedule_window(self) -> None:
+        """Arm the timer that closes the current aggregation window."""
+        self.hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER].async_track(
+            ("window", self._attr_unique_id),
+            self._aggregation_window,
+            self._handle_window_closed,
+        )
+
+    @callback
+    def _handle_window_closed(self) -> None:
+        """Publish the summary of the closed window and start the next one."""
+        self._async_schedule_window()
+        if (summary := self._aggregator.flush()) is None:
+            return
+
+        self._update_state(summary[self._aggregation_statistic])
+        self._attr_extra_state_attributes = {
+            **(self._attr_extra_state_attributes or {}),
+            **summary,
+        }
         self.async_write_ha_state()
 
     def _update_state(self, state: Any) -> None:
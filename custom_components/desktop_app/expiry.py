@@ -0,0 +1,201 @@
+"""Shared expiry scheduler for device heartbeats and sensor expiry."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable
+from datetime import datetime
+from functools import partial
+import heapq
+from itertools import count
+import logging
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    ATTR_DEVICE_ID,
+    ATTR_HEARTBEAT_TIMEOUT,
+    DATA_EXPIRY_SCHEDULER,
+    DATA_UNAVAILABLE_DEVICES,
+    DEFAULT_HEARTBEAT_TIMEOUT,
+    DOMAIN,
+    EXPIRY_TICK_INTERVAL,
+    SIGNAL_DEVICE_AVAILABILITY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """Track deadlines for many keys with a single heap and a single timer.
+
+    Touching a key only moves its deadline in a dict, which is O(1). The heap
+    keeps at most one live entry per key; when an entry comes due and the
+    key was touched in the meantime, it is pushed back with the new deadline
+    instead of expiring. Entries whose deadline no longer matches the live
+    one are stale and skipped. Keys are (kind, id) tuples so heartbeats,
+    sensor expiry and aggregation windows never collide.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._counter = count()
+        self._deadlines: dict[Hashable, float] = {}
+        self._scheduled: dict[Hashable, float] = {}
+        self._timeouts: dict[Hashable, float] = {}
+        self._callbacks: dict[Hashable, Callable[[], None]] = {}
+        self._expired: set[Hashable] = set()
+        self._unsub: CALLBACK_TYPE | None = None
+
+    def __len__(self) -> int:
+        """Return the number of tracked keys."""
+        return len(self._timeouts)
+
+    @callback
+    def async_start(self) -> None:
+        """Start the shared tick."""
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self._hass, self._async_tick, EXPIRY_TICK_INTERVAL
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the shared tick."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def async_track(
+        self, key: Hashable, timeout: float, expired_callback: Callable[[], None]
+    ) -> None:
+        """Start (or restart) tracking a key that expires after timeout seconds."""
+        self._timeouts[key] = timeout
+        self._callbacks[key] = expired_callback
+        self._expired.discard(key)
+        self._set_deadline(key, self._hass.loop.time() + timeout)
+
+    @callback
+    def async_untrack(self, key: Hashable) -> None:
+        """Stop tracking a key; its heap entry is dropped lazily."""
+        self._timeouts.pop(key, None)
+        self._callbacks.pop(key, None)
+        self._deadlines.pop(key, None)
+        self._scheduled.pop(key, None)
+        self._expired.discard(key)
+
+    @callback
+    def async_touch(self, key: Hashable) -> bool:
+        """Push a key's deadline out by its timeout.
+
+        Returns True when the key had already expired, so the caller can mark
+        whatever it guards as available again.
+        """
+        if (timeout := self._timeouts.get(key)) is None:
+            return False
+
+        deadline = self._hass.loop.time() + timeout
+        if key in self._expired:
+            self._expired.discard(key)
+            self._set_deadline(key, deadline)
+            return True
+
+        self._deadlines[key] = deadline
+        return False
+
+    def _set_deadline(self, key: Hashable, deadline: float) -> None:
+        """Set a deadline and make sure a heap entry fires no later than it."""
+        self._deadlines[key] = deadline
+        scheduled = self._scheduled.get(key)
+        if scheduled is None or scheduled > deadline:
+            self._scheduled[key] = deadline
+            heapq.heappush(self._heap, (deadline, next(self._counter), key))
+
+    @callback
+    def _async_tick(self, _now: datetime) -> None:
+        """Expire every key whose deadline has passed."""
+        now = self._hass.loop.time()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            scheduled, _, key = heapq.heappop(heap)
+            if self._scheduled.get(key) != scheduled:
+                continue  # stale entry
+
+            deadline = self._deadlines[key]
+            if deadline > now:
+                self._scheduled[key] = deadline
+                heapq.heappush(heap, (deadline, next(self._counter), key))
+                continue
+
+            del self._scheduled[key]
+            self._expired.add(key)
+            try:
+                self._callbacks[key]()
+            except Exception:  # noqa: BLE001
+                _LOGGER.exception("Error in expiry callback for %s", key)
+
+
+def heartbeat_key(device_id: str) -> tuple[str, str]:
+    """Return the scheduler key of a device heartbeat."""
+    return ("heartbeat", device_id)
+
+
+@callback
+def async_set_device_available(
+    hass: HomeAssistant, device_id: str, available: bool
+) -> None:
+    """Record device availability and notify its entities on change."""
+    unavailable: set[str] = hass.data[DOMAIN][DATA_UNAVAILABLE_DEVICES]
+    if available == (device_id not in unavailable):
+        return
+
+    if available:
+        unavailable.discard(device_id)
+        _LOGGER.info("Device %s is reporting again", device_id)
+    else:
+        unavailable.add(device_id)
+        _LOGGER.info("Device %s missed its heartbeat, marking unavailable", device_id)
+
+    async_dispatcher_send(hass, SIGNAL_DEVICE_AVAILABILITY.format(device_id))
+
+
+@callback
+def async_track_device_heartbeat(
+    hass: HomeAssistant, registration: dict[str, Any]
+) -> None:
+    """(Re)start the heartbeat deadline of a device from its registration."""
+    device_id = registration[ATTR_DEVICE_ID]
+    scheduler: ExpiryScheduler = hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER]
+    timeout = registration.get(ATTR_HEARTBEAT_TIMEOUT, DEFAULT_HEARTBEAT_TIMEOUT)
+
+    if not timeout:
+        scheduler.async_untrack(heartbeat_key(device_id))
+        async_set_device_available(hass, device_id, True)
+        return
+
+    scheduler.async_track(
+        heartbeat_key(device_id),
+        timeout,
+        partial(async_set_device_available, hass, device_id, False),
+    )
+
+
+@callback
+def async_untrack_device_heartbeat(hass: HomeAssistant, device_id: str) -> None:
+    """Stop tracking the heartbeat of a device."""
+    scheduler: ExpiryScheduler = hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER]
+    scheduler.async_untrack(heartbeat_key(device_id))
+    hass.data[DOMAIN][DATA_UNAVAILABLE_DEVICES].discard(device_id)
+
+
+@callback
+def async_device_heartbeat(hass: HomeAssistant, device_id: str) -> None:
+    """Record that a device has just been heard from."""
+    scheduler: ExpiryScheduler = hass.data[DOMAIN][DATA_EXPIRY_SCHEDULER]
+    if scheduler.async_touch(heartbeat_key(device_id)):
+        async_set_device_available(hass, device_id, True)
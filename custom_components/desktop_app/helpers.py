@@ -2,45 +2,91 @@
 
 from __future__ import annotations
 
+import hashlib
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Any
 
-from aiohttp.web import Response, json_response
+from aiohttp.web import Request, Response, json_response
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.json import json_bytes_sorted
+from homeassistant.util.json import json_loads
 
 from .const import (
     ATTR_APP_VERSION,
+    ATTR_DEFINITION_HASH,
     ATTR_DEVICE_ID,
     ATTR_DEVICE_NAME,
     ATTR_MANUFACTURER,
     ATTR_MODEL,
     ATTR_OS_NAME,
     ATTR_OS_VERSION,
+    ATTR_SENSOR_STATE,
+    ATTR_SENSOR_UNIQUE_ID,
+    ATTR_SENSORS_MATCH,
+    DATA_SENSORS_BY_DEVICE,
+    DATA_STARTUP_SPAN_STARTS,
+    DATA_STARTUP_TIMINGS,
     DOMAIN,
+    ENTITY_ADD_DELAY,
+    EXECUTOR_JSON_THRESHOLD,
+    MAX_WEBHOOK_BODY_SIZE,
 )
+from .tracing import STAGE_RESPONSE_ENCODE, trace_stage
 
 
 def webhook_response(data: dict[str, Any] | None = None, status: int = 200) -> Response:
     """Create a webhook response."""
     if data is None:
         data = {}
-    return json_response(data, status=status)
+    with trace_stage(STAGE_RESPONSE_ENCODE):
+        return json_response(data, status=status)
 
 
 def error_response(message: str, status: int = 400) -> Response:
     """Create an error response."""
-    return json_response({"success": False, "error": message}, status=status)
+    with trace_stage(STAGE_RESPONSE_ENCODE):
+        return json_response({"success": False, "error": message}, status=status)
 
 
-def registration_response(webhook_id: str) -> Response:
+def registration_response(
+    webhook_id: str, sensors_match: bool | None = None
+) -> Response:
     """Create a registration success response."""
-    return json_response(
-        {
-            "success": True,
-            "webhook_id": webhook_id,
-        }
-    )
+    data: dict[str, Any] = {
+        "success": True,
+        "webhook_id": webhook_id,
+    }
+    if sensors_match is not None:
+        data[ATTR_SENSORS_MATCH] = sensors_match
+    return json_response(data)
+
+
+class BodyTooLargeError(Exception):
+    """A request body grew past the body size limit while it was read."""
+
+
+async def async_read_json(hass: HomeAssistant, request: Request) -> Any:
+    """Read and decode a JSON request body; raises ValueError if invalid.
+
+    Reading stops with BodyTooLargeError once the body exceeds the limit,
+    which also covers chunked requests without a Content-Length. Large
+    bodies are decoded in the executor, small ones inline.
+    """
+    body = bytearray()
+    async for chunk in request.content.iter_any():
+        body += chunk
+        if len(body) > MAX_WEBHOOK_BODY_SIZE:
+            raise BodyTooLargeError
+    if len(body) < EXECUTOR_JSON_THRESHOLD:
+        return json_loads(body)
+    return await hass.async_add_executor_job(json_loads, body)
 
 
 def get_device_info(registration: dict[str, Any]) -> dr.DeviceInfo:
@@ -57,3 +103,136 @@ def get_device_info(registration: dict[str, Any]) -> dr.DeviceInfo:
 def get_device_name(registration: dict[str, Any]) -> str:
     """Get device name from registration data."""
     return registration.get(ATTR_DEVICE_NAME, "Desktop App")
+
+
+def is_valid_timeout(value: Any) -> bool:
+    """Return True if value is usable as a timeout in seconds."""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and value >= 0
+    )
+
+
+def get_device_sensors(
+    hass: HomeAssistant, device_id: str
+) -> dict[str, dict[str, Any]]:
+    """Return the registered sensor definitions of a single device."""
+    return hass.data[DOMAIN][DATA_SENSORS_BY_DEVICE].get(device_id, {})
+
+
+def json_fingerprint(data: Any) -> str:
+    """Return the SHA-1 of a value as UTF-8 JSON with sorted keys, no whitespace.
+
+    Clients compute the same hash to compare their data with what HA holds.
+    """
+    return hashlib.sha1(json_bytes_sorted(data)).hexdigest()
+
+
+def definition_fingerprint(data: dict[str, Any]) -> str:
+    """Return the fingerprint of register_sensor data without its state.
+
+    The state changes all the time and is not part of the definition.
+    """
+    return json_fingerprint(
+        {key: value for key, value in data.items() if key != ATTR_SENSOR_STATE}
+    )
+
+
+def sensors_fingerprint(device_sensors: dict[str, dict[str, Any]]) -> str:
+    """Return the fingerprint of a device's stored sensor definitions.
+
+    This is the fingerprint of an object that maps each sensor_unique_id to
+    the fingerprint of its register_sensor data without the state.
+    """
+    return json_fingerprint(
+        {
+            sensor_data[ATTR_SENSOR_UNIQUE_ID]: sensor_data.get(ATTR_DEFINITION_HASH)
+            for sensor_data in device_sensors.values()
+        }
+    )
+
+
+def index_sensors_by_device(
+    registered_sensors: dict[str, dict[str, Any]],
+) -> dict[str, dict[str, dict[str, Any]]]:
+    """Group registered sensor definitions by device_id.
+
+    Platforms look sensors up per device; without this index every entry
+    setup scans the sensors of the whole fleet.
+    """
+    index: dict[str, dict[str, dict[str, Any]]] = {}
+    for key, sensor_data in registered_sensors.items():
+        index.setdefault(sensor_data.get(ATTR_DEVICE_ID), {})[key] = sensor_data
+    return index
+
+
+@contextmanager
+def time_startup_phase(
+    hass: HomeAssistant, phase: str, awaited: bool = False
+) -> Iterator[None]:
+    """Record the wall time spent in a startup phase.
+
+    Synchronous phases add up their durations. Config entries are set up
+    concurrently, so awaited phases of different entries overlap; for them
+    the span from the first start to the last end is recorded instead, and
+    only while Home Assistant is starting.
+    """
+    if awaited and hass.is_running:
+        yield
+        return
+    start = time.perf_counter()
+    if awaited:
+        start = hass.data[DOMAIN][DATA_STARTUP_SPAN_STARTS].setdefault(phase, start)
+    try:
+        yield
+    finally:
+        timings = hass.data[DOMAIN][DATA_STARTUP_TIMINGS]
+        phase_timing = timings.setdefault(phase, {"count": 0, "seconds": 0.0})
+        phase_timing["count"] += 1
+        if awaited:
+            phase_timing["seconds"] = time.perf_counter() - start
+        else:
+            phase_timing["seconds"] += time.perf_counter() - start
+
+
+class EntityAddBatcher:
+    """Collect entities registered at runtime and add them in one call.
+
+    A client registers its sensors one request at a time; adding each of
+    them separately costs a platform add cycle and registry write per sensor.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, async_add_entities: AddEntitiesCallback
+    ) -> None:
+        """Initialize the batcher."""
+        self._hass = hass
+        self._async_add_entities = async_add_entities
+        self._entities: list[Entity] = []
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add(self, entity: Entity) -> None:
+        """Queue an entity; the batch is added after a short delay."""
+        self._entities.append(entity)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, ENTITY_ADD_DELAY, self._async_flush
+            )
+
+    @callback
+    def _async_flush(self, _now: Any = None) -> None:
+        """Add all queued entities."""
+        self._unsub_flush = None
+        entities, self._entities = self._entities, []
+        if entities:
+            self._async_add_entities(entities)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop queued entities when the platform unloads."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        self._entities.clear()
@@ -2,28 +2,58 @@
 
 from __future__ import annotations
 
+import json
 import logging
 import secrets
+import time
 from typing import Any
 
+from aiohttp import hdrs
 from aiohttp.web import Request, Response, json_response
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.http import HomeAssistantView
 
 from .const import (
     ATTR_APP_VERSION,
     ATTR_DEVICE_ID,
     ATTR_DEVICE_NAME,
+    ATTR_HEARTBEAT_TIMEOUT,
     ATTR_MANUFACTURER,
     ATTR_MODEL,
     ATTR_OS_NAME,
     ATTR_OS_VERSION,
+    ATTR_SENSORS_HASH,
     ATTR_WEBHOOK_ID,
+    DATA_CAPTURE,
+    DATA_CONFIG_ENTRIES,
+    DATA_DEVICE_STATES,
+    DATA_SENSOR_LAST_SEEN,
+    DATA_SENSOR_SEQUENCES,
     DOMAIN,
     EVENT_DESKTOP_APP_UPDATE,
+    MAX_RELAY_BATCHES,
+    MAX_STRING_LENGTH,
 )
-from .helpers import error_response, registration_response
+from .capture import SOURCE_RELAY, SOURCE_UPDATE
+from .expiry import async_track_device_heartbeat
+from .helpers import (
+    BodyTooLargeError,
+    async_read_json,
+    error_response,
+    get_device_sensors,
+    is_valid_timeout,
+    registration_response,
+    sensors_fingerprint,
+)
+from .snapshot import DeviceStateIndex
+from .validation import (
+    BODY_TOO_LARGE,
+    Rejection,
+    async_reject,
+    check_body_size,
+)
+from .webhook import async_handle_command
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,9 +64,46 @@ REGISTRATION_SCHEMA_OPTIONAL = [
     ATTR_OS_NAME,
     ATTR_OS_VERSION,
     ATTR_APP_VERSION,
+    ATTR_HEARTBEAT_TIMEOUT,
 ]
 
 
+@callback
+def _async_touch_sensors(
+    hass: HomeAssistant, device_sensors: dict[str, dict[str, Any]]
+) -> None:
+    """Mark a device's sensors as seen when it skips registering them.
+
+    Otherwise sensors whose value never changes would age out of
+    compaction although the device is active.
+    """
+    from . import _async_schedule_save_store
+
+    last_seen: dict[str, float] = hass.data[DOMAIN][DATA_SENSOR_LAST_SEEN]
+    now = time.time()
+    for unique_store_key in device_sensors:
+        last_seen[unique_store_key] = now
+    _async_schedule_save_store(hass)
+
+
+@callback
+def _async_update_heartbeat_timeout(
+    hass: HomeAssistant, entry_id: str, entry_data: dict[str, Any], timeout: float
+) -> None:
+    """Apply the heartbeat timeout a re-registering device sent."""
+    from . import _async_schedule_save_store
+
+    entry_data[ATTR_HEARTBEAT_TIMEOUT] = timeout
+    # Setup rebuilds the stored copy from the config entry, so the entry
+    # itself has to change for the timeout to survive a restart
+    if (entry := hass.config_entries.async_get_entry(entry_id)) is not None:
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, ATTR_HEARTBEAT_TIMEOUT: timeout}
+        )
+    async_track_device_heartbeat(hass, entry_data)
+    _async_schedule_save_store(hass)
+
+
 class DesktopAppPingView(HomeAssistantView):
     """Health check endpoint to verify the Desktop App integration is loaded and reachable."""
 
@@ -83,18 +150,55 @@ class DesktopAppRegistrationView(HomeAssistantView):
             if field not in data:
                 return error_response(f"Missing required field: {field}", status=400)
 
+        if ATTR_HEARTBEAT_TIMEOUT in data and not is_valid_timeout(
+            data[ATTR_HEARTBEAT_TIMEOUT]
+        ):
+            return error_response(
+                f"Invalid {ATTR_HEARTBEAT_TIMEOUT}: must be a non-negative number",
+                status=400,
+            )
+
+        sensors_hash = data.get(ATTR_SENSORS_HASH)
+        if sensors_hash is not None and (
+            not isinstance(sensors_hash, str) or len(sensors_hash) > MAX_STRING_LENGTH
+        ):
+            return error_response(
+                f"Invalid {ATTR_SENSORS_HASH}: must be a string", status=400
+            )
+
         device_id = data[ATTR_DEVICE_ID]
 
         # Check if device is already registered
         existing_entries = hass.data.get(DOMAIN, {}).get("config_entries", {})
         for entry_id, entry_data in existing_entries.items():
             if entry_data.get(ATTR_DEVICE_ID) == device_id:
-                # Device already registered, return existing webhook_id
+                # Device already registered, return existing webhook_id.
+                # The client restarted, so its sequence counter may have
+                # restarted too; forget the last seen sequence numbers.
+                hass.data[DOMAIN][DATA_SENSOR_SEQUENCES].pop(device_id, None)
                 _LOGGER.info(
                     "Device %s already registered, returning existing webhook_id",
                     device_id,
                 )
-                return registration_response(entry_data[ATTR_WEBHOOK_ID])
+                if ATTR_HEARTBEAT_TIMEOUT in data and data[
+                    ATTR_HEARTBEAT_TIMEOUT
+                ] != entry_data.get(ATTR_HEARTBEAT_TIMEOUT):
+                    _async_update_heartbeat_timeout(
+                        hass, entry_id, entry_data, data[ATTR_HEARTBEAT_TIMEOUT]
+                    )
+                # A client that sent the fingerprint of its sensor
+                # definitions can skip register_sensor when they match
+                sensors_match = None
+                if sensors_hash is not None:
+                    device_sensors = get_device_sensors(hass, device_id)
+                    sensors_match = sensors_hash == sensors_fingerprint(
+                        device_sensors
+                    )
+                    if sensors_match:
+                        _async_touch_sensors(hass, device_sensors)
+                return registration_response(
+                    entry_data[ATTR_WEBHOOK_ID], sensors_match
+                )
 
         # Generate webhook_id
         webhook_id = secrets.token_hex(32)
@@ -122,7 +226,9 @@ class DesktopAppRegistrationView(HomeAssistantView):
 
         if result.get("type") == "create_entry":
             _LOGGER.info("Device %s registered successfully", device_id)
-            return registration_response(webhook_id)
+            return registration_response(
+                webhook_id, False if sensors_hash is not None else None
+            )
 
         _LOGGER.error("Failed to create config entry for device %s", device_id)
         return error_response("Failed to register device", status=500)
@@ -148,6 +254,122 @@ class DesktopAppDataView(HomeAssistantView):
 
         _LOGGER.debug("Desktop app update received: %s", data)
 
+        if (capture := hass.data[DOMAIN][DATA_CAPTURE]) is not None:
+            capture.async_record(
+                SOURCE_UPDATE, str(data.get(ATTR_DEVICE_ID)), None, data
+            )
+
         hass.bus.async_fire(EVENT_DESKTOP_APP_UPDATE, dict(data))
 
         return json_response({"result": "ok"})
+
+
+class DesktopAppRelayView(HomeAssistantView):
+    """Accept webhook commands for many devices in one request (for gateways)."""
+
+    url = "/api/desktop_app/relay"
+    name = "api:desktop_app:relay"
+    requires_auth = True
+
+    async def post(self, request: Request) -> Response:
+        """Run each batch through the webhook command handlers of its device."""
+        hass: HomeAssistant = request.app["hass"]
+        if rejection := check_body_size(request.content_length):
+            return async_reject(hass, rejection)
+
+        try:
+            data: dict[str, Any] = await async_read_json(hass, request)
+        except BodyTooLargeError:
+            return async_reject(hass, BODY_TOO_LARGE)
+        except ValueError:
+            return error_response("Invalid JSON", status=400)
+
+        batches = data.get("batches") if isinstance(data, dict) else None
+        if not isinstance(batches, list):
+            return error_response("'batches' must be a list", status=400)
+        if len(batches) > MAX_RELAY_BATCHES:
+            return async_reject(
+                hass,
+                Rejection(
+                    "too_many_batches",
+                    f"At most {MAX_RELAY_BATCHES} batches per request",
+                    413,
+                ),
+            )
+
+        # Index the registrations once instead of scanning them per batch
+        by_webhook_id: dict[str, dict[str, Any]] = {}
+        by_device_id: dict[str, dict[str, Any]] = {}
+        for entry_data in hass.data[DOMAIN][DATA_CONFIG_ENTRIES].values():
+            by_webhook_id[entry_data.get(ATTR_WEBHOOK_ID)] = entry_data
+            by_device_id[entry_data.get(ATTR_DEVICE_ID)] = entry_data
+
+        results = []
+        for batch in batches:
+            key: dict[str, Any] = {}
+            config_entry = None
+            rejection = None
+            if isinstance(batch, dict):
+                if ATTR_WEBHOOK_ID in batch:
+                    id_field, registrations = ATTR_WEBHOOK_ID, by_webhook_id
+                else:
+                    id_field, registrations = ATTR_DEVICE_ID, by_device_id
+                batch_id = key[id_field] = batch.get(id_field)
+                if isinstance(batch_id, str):
+                    config_entry = registrations.get(batch_id)
+                elif batch_id is not None:
+                    rejection = Rejection(
+                        "invalid_batch", f"'{id_field}' must be a string"
+                    )
+
+            if rejection:
+                response = async_reject(hass, rejection)
+            else:
+                webhook_id = config_entry[ATTR_WEBHOOK_ID] if config_entry else ""
+                response = await async_handle_command(
+                    hass, config_entry, webhook_id, batch, SOURCE_RELAY
+                )
+            result = {
+                **key,
+                "status": response.status,
+                "response": json.loads(response.body),
+            }
+            # Devices over their budget are told when to send again
+            if retry_after := response.headers.get(hdrs.RETRY_AFTER):
+                result["retry_after"] = int(retry_after)
+            results.append(result)
+
+        _LOGGER.debug("Relayed %d batches", len(batches))
+
+        return json_response({"success": True, "results": results})
+
+
+class DesktopAppStateView(HomeAssistantView):
+    """Return the last values HA received from a device, for delta sync."""
+
+    url = "/api/desktop_app/state/{device_id}"
+    name = "api:desktop_app:state"
+    requires_auth = True
+
+    async def get(self, request: Request, device_id: str) -> Response:
+        """Return the device snapshot, or 304 if the client's copy is current."""
+        hass: HomeAssistant = request.app["hass"]
+        if not any(
+            entry_data.get(ATTR_DEVICE_ID) == device_id
+            for entry_data in hass.data[DOMAIN][DATA_CONFIG_ENTRIES].values()
+        ):
+            return error_response("Device not registered", status=404)
+
+        state_index: DeviceStateIndex = hass.data[DOMAIN][DATA_DEVICE_STATES].get(
+            device_id
+        ) or DeviceStateIndex()
+        etag = state_index.etag
+        if_none_match = request.headers.get(hdrs.IF_NONE_MATCH, "")
+        if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status=304, headers={hdrs.ETAG: etag})
+
+        return Response(
+            body=state_index.body(device_id),
+            content_type="application/json",
+            headers={hdrs.ETAG: etag},
+        )
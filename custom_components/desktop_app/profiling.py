@@ -0,0 +1,90 @@
+"""On-demand profiling of the Desktop App ingest path."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+from pathlib import Path
+import pstats
+import re
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_DURATION,
+    DATA_PROFILER,
+    DOMAIN,
+    SERVICE_START_PROFILE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+START_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+# Only frames from this package end up in the text report
+PACKAGE_PATH_PATTERN = re.escape(str(Path(__file__).parent))
+
+
+@callback
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the profiling service."""
+
+    async def _async_start_profile(call: ServiceCall) -> None:
+        """Profile the event loop for a while and write the results."""
+        if hass.data[DOMAIN].get(DATA_PROFILER) is not None:
+            raise HomeAssistantError("A Desktop App profile is already running")
+
+        duration: float = call.data[ATTR_DURATION]
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as err:
+            # Python 3.12+ allows a single active profiler per interpreter
+            raise HomeAssistantError(f"Cannot start profiler: {err}") from err
+        hass.data[DOMAIN][DATA_PROFILER] = profiler
+
+        _LOGGER.warning("Desktop App profiling started for %.0f seconds", duration)
+        async_call_later(hass, duration, _async_stop_profile)
+
+    async def _async_stop_profile(_now) -> None:
+        """Stop profiling and write the profile files in the executor."""
+        profiler: cProfile.Profile = hass.data[DOMAIN].pop(DATA_PROFILER)
+        profiler.disable()
+
+        timestamp = dt_util.utcnow().strftime("%Y%m%d_%H%M%S")
+        base = Path(hass.config.path(f"{DOMAIN}_profile_{timestamp}"))
+        await hass.async_add_executor_job(_write_profile, profiler, base)
+        _LOGGER.warning(
+            "Desktop App profile written to %s.prof (summary in %s.txt)", base, base
+        )
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_PROFILE,
+        _async_start_profile,
+        schema=START_PROFILE_SCHEMA,
+    )
+
+
+def _write_profile(profiler: cProfile.Profile, base: Path) -> None:
+    """Dump the raw profile and a report restricted to this integration."""
+    profiler.dump_stats(f"{base}.prof")
+
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PACKAGE_PATH_PATTERN)
+    Path(f"{base}.txt").write_text(report.getvalue(), encoding="utf-8")
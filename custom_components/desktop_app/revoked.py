@@ -0,0 +1,120 @@
+"""Answer requests to the webhooks of removed devices cheaply."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import logging
+import time
+
+from aiohttp import hdrs
+from aiohttp.web import Request, Response
+
+from homeassistant.components import webhook as webhook_component
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DOMAIN,
+    MAX_REVOKED_WEBHOOKS,
+    REVOKED_RETRY_AFTER_MAX,
+    REVOKED_RETRY_AFTER_MIN,
+)
+from .helpers import error_response
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RevokedWebhooks:
+    """Bounded cache of the webhook ids of removed devices.
+
+    Home Assistant answers requests to unknown webhooks with 200, so the
+    client of a removed device never learns it should stop. Each revoked id
+    stays registered with a handler that answers 410 without reading the
+    body, with a Retry-After that doubles on every request. The least
+    recently hit ids are dropped once the cache is full.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_size: int = MAX_REVOKED_WEBHOOKS):
+        """Initialize the cache."""
+        self._hass = hass
+        self._max_size = max_size
+        # webhook_id -> [revoked at, requests since]
+        self._revoked: OrderedDict[str, list[float]] = OrderedDict()
+        self.hits = 0
+
+    def __len__(self) -> int:
+        """Return the number of revoked webhook ids held."""
+        return len(self._revoked)
+
+    def __contains__(self, webhook_id: str) -> bool:
+        """Return whether a webhook id is revoked."""
+        return webhook_id in self._revoked
+
+    @callback
+    def async_revoke(self, webhook_id: str, revoked_at: float | None = None) -> None:
+        """Start answering a webhook id as revoked."""
+        if webhook_id in self._revoked:
+            return
+        webhook_component.async_register(
+            self._hass,
+            DOMAIN,
+            "Desktop App (removed device)",
+            webhook_id,
+            self._async_handle_revoked,
+            allowed_methods=["POST"],
+        )
+        self._revoked[webhook_id] = [revoked_at or time.time(), 0]
+        while len(self._revoked) > self._max_size:
+            self._async_drop(next(iter(self._revoked)))
+
+    @callback
+    def async_forget(self, webhook_id: str) -> None:
+        """Stop answering a webhook id as revoked."""
+        if webhook_id in self._revoked:
+            self._async_drop(webhook_id)
+
+    @callback
+    def async_expire(self, before: float) -> int:
+        """Forget webhook ids revoked before a timestamp; returns how many."""
+        expired = [
+            webhook_id
+            for webhook_id, (revoked_at, _) in self._revoked.items()
+            if revoked_at < before
+        ]
+        for webhook_id in expired:
+            self._async_drop(webhook_id)
+        return len(expired)
+
+    def _async_drop(self, webhook_id: str) -> None:
+        """Remove a webhook id from the cache and unregister its handler."""
+        del self._revoked[webhook_id]
+        webhook_component.async_unregister(self._hass, webhook_id)
+
+    def revoked_at(self) -> dict[str, float]:
+        """Return when each webhook id was revoked, for the store."""
+        return {
+            webhook_id: revoked_at
+            for webhook_id, (revoked_at, _) in self._revoked.items()
+        }
+
+    async def _async_handle_revoked(
+        self, hass: HomeAssistant, webhook_id: str, request: Request
+    ) -> Response:
+        """Answer 410 with a growing Retry-After, without reading the body."""
+        entry = self._revoked[webhook_id]
+        entry[1] += 1
+        self.hits += 1
+        self._revoked.move_to_end(webhook_id)
+
+        retry_after = min(
+            REVOKED_RETRY_AFTER_MIN * 2 ** min(entry[1] - 1, 32),
+            REVOKED_RETRY_AFTER_MAX,
+        )
+        _LOGGER.debug(
+            "Request %d to revoked webhook %s, retry after %d s",
+            entry[1],
+            webhook_id,
+            retry_after,
+        )
+        response = error_response("Device not registered", status=410)
+        response.headers[hdrs.RETRY_AFTER] = str(retry_after)
+        return response
@@ -0,0 +1,128 @@
+"""In-memory index of the last values each device sent, for delta sync."""
+
+from __future__ import annotations
+
+import secrets
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.json import json_bytes
+
+from .const import DATA_DEVICE_STATES, DOMAIN
+from .helpers import json_fingerprint
+
+# Versions restart at zero when Home Assistant restarts; the boot id keeps an
+# ETag from before the restart from matching a new snapshot
+BOOT_ID = secrets.token_hex(4)
+
+
+class DeviceStateIndex:
+    """The last state, icon and attributes of each sensor of one device.
+
+    Only values received since Home Assistant started are known; clients
+    must send every sensor missing from the snapshot.
+    """
+
+    __slots__ = ("version", "_sensors", "_body")
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.version = 0
+        # sensor_unique_id -> [state, icon, attributes, received at]
+        self._sensors: dict[str, list[Any]] = {}
+        self._body: bytes | None = None
+
+    def __len__(self) -> int:
+        """Return the number of sensors with a known value."""
+        return len(self._sensors)
+
+    @property
+    def etag(self) -> str:
+        """Return the ETag of the current snapshot."""
+        return f'"{BOOT_ID}-{self.version}"'
+
+    def received_at(self, sensor_unique_id: str) -> float | None:
+        """Return when the current value of a sensor was received."""
+        if (current := self._sensors.get(sensor_unique_id)) is None:
+            return None
+        return current[3]
+
+    def update(
+        self,
+        sensor_unique_id: str,
+        state: Any,
+        icon: str | None = None,
+        attributes: dict[str, Any] | None = None,
+        received_at: float | None = None,
+    ) -> None:
+        """Record an update; a missing icon or attributes keeps the old ones.
+
+        This mirrors how entities apply updates. The version only moves when
+        a value actually changed. The receive time defaults to now.
+        """
+        if received_at is None:
+            received_at = time.time()
+        if (current := self._sensors.get(sensor_unique_id)) is None:
+            self._sensors[sensor_unique_id] = [
+                state,
+                icon,
+                attributes or {},
+                received_at,
+            ]
+        else:
+            current[3] = received_at
+            if (
+                current[0] == state
+                and (not icon or current[1] == icon)
+                and (attributes is None or current[2] == attributes)
+            ):
+                return
+            current[0] = state
+            if icon:
+                current[1] = icon
+            if attributes is not None:
+                current[2] = attributes
+        self.version += 1
+        self._body = None
+
+    def remove(self, sensor_unique_id: str) -> None:
+        """Forget a sensor."""
+        if self._sensors.pop(sensor_unique_id, None) is not None:
+            self.version += 1
+            self._body = None
+
+    def body(self, device_id: str) -> bytes:
+        """Return the JSON snapshot; it is only rebuilt after a change."""
+        if self._body is None:
+            self._body = json_bytes(
+                {
+                    "device_id": device_id,
+                    "version": self.version,
+                    "sensors": {
+                        sensor_unique_id: {
+                            "state": state,
+                            "icon": icon,
+                            "attributes_hash": json_fingerprint(attributes),
+                        }
+                        for sensor_unique_id, (
+                            state,
+                            icon,
+                            attributes,
+                            _,
+                        ) in self._sensors.items()
+                    },
+                }
+            )
+        return self._body
+
+
+@callback
+def async_get_device_state_index(
+    hass: HomeAssistant, device_id: str
+) -> DeviceStateIndex:
+    """Return the state index of a device, creating it if needed."""
+    indexes: dict[str, DeviceStateIndex] = hass.data[DOMAIN][DATA_DEVICE_STATES]
+    if (index := indexes.get(device_id)) is None:
+        index = indexes[device_id] = DeviceStateIndex()
+    return index
@@ -0,0 +1,263 @@
+"""Per-device budgets so one chatty client cannot starve the rest."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from functools import partial
+import logging
+import math
+import time
+from typing import Any, Callable
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    ATTR_DEVICE_ID,
+    ATTR_SENSOR_UNIQUE_ID,
+    CONF_BURST_SIZE,
+    CONF_SUSTAINED_RATE,
+    DATA_OPTIONS,
+    DEFAULT_BURST_SIZE,
+    DEFAULT_SUSTAINED_RATE,
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# (sensor update, sequence of the request it arrived in)
+SensorUpdate = tuple[dict[str, Any], float | None]
+ApplyUpdates = Callable[
+    [HomeAssistant, dict[str, Any], str, list[SensorUpdate]], list[str]
+]
+
+
+class DeviceBudget:
+    """Token bucket and deferred sensor updates of one device."""
+
+    __slots__ = (
+        "tokens",
+        "refilled_at",
+        "allowed",
+        "deferred",
+        "coalesced",
+        "rejected",
+        "backlog",
+        "config_entry",
+        "webhook_id",
+        "unsub_flush",
+    )
+
+    def __init__(self, burst: float) -> None:
+        """Initialize a full bucket."""
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.allowed = 0
+        self.deferred = 0
+        self.coalesced = 0
+        self.rejected = 0
+        # sensor_unique_id -> newest deferred update
+        self.backlog: dict[str, SensorUpdate] = {}
+        self.config_entry: dict[str, Any] = {}
+        self.webhook_id = ""
+        self.unsub_flush: CALLBACK_TYPE | None = None
+
+
+class DeviceThrottle:
+    """Charge each device's requests to its own token bucket.
+
+    A device within its budget is handled right away. Sensor updates of a
+    device over its budget are merged into one backlog per device, newest
+    value per sensor, and applied when the bucket has refilled enough to
+    pay for them. Other commands over budget are refused with 429. Neither
+    path touches the buckets of other devices.
+
+    A request costing more than the burst size is let through once the
+    bucket is full and leaves it in debt, so it is neither refused forever
+    nor undercharged. The debt is capped at one burst, so a single huge
+    request cannot lock the device out for long.
+    """
+
+    def __init__(self, hass: HomeAssistant, apply_updates: ApplyUpdates) -> None:
+        """Initialize the throttle."""
+        self._hass = hass
+        self._apply_updates = apply_updates
+        self._budgets: dict[str, DeviceBudget] = {}
+
+    def __len__(self) -> int:
+        """Return the number of devices with a budget."""
+        return len(self._budgets)
+
+    def _rates(self) -> tuple[float, float]:
+        """Return the sustained rate and burst size from the hub options."""
+        options = self._hass.data[DOMAIN][DATA_OPTIONS]
+        return (
+            options.get(CONF_SUSTAINED_RATE, DEFAULT_SUSTAINED_RATE),
+            options.get(CONF_BURST_SIZE, DEFAULT_BURST_SIZE),
+        )
+
+    def _refilled(self, device_id: str) -> tuple[DeviceBudget, float, float]:
+        """Return a device's budget topped up for the time since last use."""
+        rate, burst = self._rates()
+        now = time.monotonic()
+        if (budget := self._budgets.get(device_id)) is None:
+            budget = self._budgets[device_id] = DeviceBudget(burst)
+        else:
+            budget.tokens = min(
+                burst, budget.tokens + (now - budget.refilled_at) * rate
+            )
+        budget.refilled_at = now
+        return budget, rate, burst
+
+    @staticmethod
+    def _wait(budget: DeviceBudget, cost: float, rate: float) -> int:
+        """Return the whole seconds until the bucket can pay a cost."""
+        return max(1, math.ceil((cost - budget.tokens) / rate))
+
+    @callback
+    def async_acquire(
+        self, device_id: str, cost: int, sensor_updates: bool = False
+    ) -> int | None:
+        """Charge a request; return seconds to wait if it is over budget.
+
+        Sensor updates of a device with deferred updates are over budget
+        until those are applied, so they cannot overtake them. Other
+        commands only need the tokens.
+        """
+        budget, rate, burst = self._refilled(device_id)
+        cost = max(cost, 1)
+        queued = len(budget.backlog) if sensor_updates else 0
+        if not queued and budget.tokens >= min(cost, burst):
+            budget.tokens = max(budget.tokens - cost, -burst)
+            budget.allowed += 1
+            return None
+        return self._wait(budget, min(cost + queued, burst), rate)
+
+    @callback
+    def async_count_rejection(self, device_id: str) -> None:
+        """Count a request refused for being over budget."""
+        self._budgets[device_id].rejected += 1
+
+    @callback
+    def async_defer(
+        self,
+        config_entry: dict[str, Any],
+        webhook_id: str,
+        sensor_states: list[dict[str, Any]],
+        sequence: float | None,
+    ) -> None:
+        """Merge over-budget sensor updates into the device's backlog."""
+        device_id = config_entry[ATTR_DEVICE_ID]
+        budget = self._budgets[device_id]
+        if not budget.backlog:
+            _LOGGER.debug(
+                "Device %s is over its budget, deferring its sensor updates",
+                device_id,
+            )
+        budget.deferred += 1
+        budget.config_entry = config_entry
+        budget.webhook_id = webhook_id
+
+        backlog = budget.backlog
+        for sensor_update in sensor_states:
+            if not (sensor_unique_id := sensor_update.get(ATTR_SENSOR_UNIQUE_ID)):
+                continue
+            if (queued := backlog.get(sensor_unique_id)) is None:
+                backlog[sensor_unique_id] = (sensor_update, sequence)
+                continue
+            budget.coalesced += 1
+            queued_update, queued_sequence = queued
+            if (
+                sequence is not None
+                and queued_sequence is not None
+                and sequence < queued_sequence
+            ):
+                continue
+            # A field the newer update leaves out keeps its queued value,
+            # like it would on the entity
+            backlog[sensor_unique_id] = ({**queued_update, **sensor_update}, sequence)
+
+        self._async_schedule_flush(device_id, budget)
+
+    @callback
+    def _async_schedule_flush(self, device_id: str, budget: DeviceBudget) -> None:
+        """Apply the backlog once the bucket can pay for it."""
+        if budget.unsub_flush is not None:
+            return
+        rate, burst = self._rates()
+        cost = min(len(budget.backlog), burst)
+        budget.unsub_flush = async_call_later(
+            self._hass,
+            max(0, (cost - budget.tokens) / rate),
+            partial(self._async_flush, device_id),
+        )
+
+    @callback
+    def _async_flush(self, device_id: str, _now: datetime) -> None:
+        """Apply the deferred updates of a device."""
+        budget, _, burst = self._refilled(device_id)
+        budget.unsub_flush = None
+        cost = min(len(budget.backlog), burst)
+        if budget.tokens < cost:
+            # Woken early, or the rates were lowered while waiting
+            self._async_schedule_flush(device_id, budget)
+            return
+
+        budget.tokens -= cost
+        backlog, budget.backlog = budget.backlog, {}
+        stale = self._apply_updates(
+            self._hass, budget.config_entry, budget.webhook_id, list(backlog.values())
+        )
+        _LOGGER.debug(
+            "Applied %d deferred sensor updates for device %s (%d stale)",
+            len(backlog),
+            device_id,
+            len(stale),
+        )
+
+    @callback
+    def async_forget(self, device_id: str) -> None:
+        """Drop a device's budget and any updates still deferred."""
+        if (budget := self._budgets.pop(device_id, None)) is None:
+            return
+        if budget.unsub_flush is not None:
+            budget.unsub_flush()
+        if budget.backlog:
+            _LOGGER.debug(
+                "Dropped %d deferred sensor updates of device %s",
+                len(budget.backlog),
+                device_id,
+            )
+
+    @staticmethod
+    def _usage(
+        budget: DeviceBudget, rate: float, burst: float, now: float
+    ) -> dict[str, Any]:
+        """Return the budget usage of one device."""
+        tokens = min(burst, budget.tokens + (now - budget.refilled_at) * rate)
+        return {
+            "tokens": round(tokens, 1),
+            "usage": round(1 - tokens / burst, 3),
+            "allowed": budget.allowed,
+            "deferred": budget.deferred,
+            "coalesced": budget.coalesced,
+            "rejected": budget.rejected,
+            "backlog": len(budget.backlog),
+        }
+
+    def diagnostics(self, device_id: str | None = None) -> dict[str, Any]:
+        """Return the rates and the budget usage of one or every device."""
+        rate, burst = self._rates()
+        now = time.monotonic()
+        rates = {"sustained_rate": rate, "burst_size": burst}
+        if device_id is not None:
+            if (budget := self._budgets.get(device_id)) is None:
+                return rates
+            return {**rates, **self._usage(budget, rate, burst, now)}
+        return {
+            **rates,
+            "devices": {
+                budget_device_id: self._usage(budget, rate, burst, now)
+                for budget_device_id, budget in self._budgets.items()
+            },
+        }
@@ -0,0 +1,205 @@
+"""Per-stage timing of Desktop App webhook requests."""
+
+from __future__ import annotations
+
+from collections import deque
+from contextvars import ContextVar
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    CONF_SLOW_REQUEST_THRESHOLD,
+    DATA_OPTIONS,
+    DATA_REQUEST_STATS,
+    DEFAULT_SLOW_REQUEST_THRESHOLD,
+    DOMAIN,
+    SLOW_REQUEST_HISTORY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STAGE_JSON_PARSE = "json_parse"
+STAGE_ENTRY_LOOKUP = "entry_lookup"
+STAGE_VALIDATION = "validation"
+STAGE_DISPATCH = "dispatch"
+STAGE_STATE_WRITE = "state_write"
+STAGE_STORE_SAVE = "store_save"
+STAGE_RESPONSE_ENCODE = "response_encode"
+
+# Set for the duration of a webhook request; each request runs in its own
+# task and therefore sees its own trace.
+CURRENT_TRACE: ContextVar[RequestTrace | None] = ContextVar(
+    f"{DOMAIN}_request_trace", default=None
+)
+
+
+class _Stage:
+    """Context manager that attributes time to one stage of a trace."""
+
+    __slots__ = ("_trace", "_name")
+
+    def __init__(self, trace: RequestTrace, name: str) -> None:
+        """Initialize the stage."""
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self) -> None:
+        """Start timing the stage."""
+        self._trace.push(self._name)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop timing the stage."""
+        self._trace.pop()
+
+
+class _NullStage:
+    """Stage used when no request is being traced."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        """Do nothing."""
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Do nothing."""
+
+
+_NULL_STAGE = _NullStage()
+
+
+class RequestTrace:
+    """Exclusive time per stage of a single request.
+
+    Stages nest: while a nested stage runs (a state write inside the dispatch
+    loop, say) the outer stage is paused, so the stage times add up to the
+    time spent in traced code without double counting.
+    """
+
+    __slots__ = (
+        "device_id",
+        "command",
+        "items",
+        "stages",
+        "total",
+        "_stack",
+        "_mark",
+        "_start",
+    )
+
+    def __init__(self) -> None:
+        """Start the trace."""
+        self.device_id: str | None = None
+        self.command: str | None = None
+        self.items = 0
+        self.stages: dict[str, float] = {}
+        self.total = 0.0
+        self._stack: list[str] = []
+        self._start = self._mark = time.perf_counter()
+
+    def stage(self, name: str) -> _Stage:
+        """Return a context manager timing the named stage."""
+        return _Stage(self, name)
+
+    def push(self, name: str) -> None:
+        """Enter a stage, pausing the current one."""
+        now = time.perf_counter()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        self._stack.append(name)
+        self._mark = now
+
+    def pop(self) -> None:
+        """Leave the current stage, resuming the outer one."""
+        now = time.perf_counter()
+        self._charge(self._stack.pop(), now)
+        self._mark = now
+
+    def _charge(self, name: str, now: float) -> None:
+        """Add the time since the last mark to a stage."""
+        self.stages[name] = self.stages.get(name, 0.0) + now - self._mark
+
+    def finish(self) -> None:
+        """Stop the trace."""
+        self.total = time.perf_counter() - self._start
+
+
+def trace_stage(name: str) -> _Stage | _NullStage:
+    """Time a stage of the current request, if one is being traced."""
+    if (trace := CURRENT_TRACE.get()) is None:
+        return _NULL_STAGE
+    return trace.stage(name)
+
+
+def set_trace_info(
+    device_id: str | None = None,
+    command: str | None = None,
+    items: int | None = None,
+) -> None:
+    """Attach request details to the current trace."""
+    if (trace := CURRENT_TRACE.get()) is None:
+        return
+    if device_id is not None:
+        trace.device_id = device_id
+    if command is not None:
+        trace.command = command
+    if items is not None:
+        trace.items = items
+
+
+@callback
+def async_record_trace(hass: HomeAssistant, trace: RequestTrace) -> None:
+    """Finish a trace, add it to the per-device stats and log it if slow."""
+    trace.finish()
+
+    stats = hass.data[DOMAIN][DATA_REQUEST_STATS]
+    if trace.device_id is not None and trace.command is not None:
+        command_stats = (
+            stats["devices"]
+            .setdefault(trace.device_id, {})
+            .setdefault(
+                trace.command, {"count": 0, "total": 0.0, "max": 0.0, "stages": {}}
+            )
+        )
+        command_stats["count"] += 1
+        command_stats["total"] += trace.total
+        command_stats["max"] = max(command_stats["max"], trace.total)
+        stage_totals = command_stats["stages"]
+        for name, seconds in trace.stages.items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+
+    threshold = hass.data[DOMAIN][DATA_OPTIONS].get(
+        CONF_SLOW_REQUEST_THRESHOLD, DEFAULT_SLOW_REQUEST_THRESHOLD
+    )
+    if trace.total * 1000 < threshold:
+        return
+
+    breakdown = {
+        name: round(seconds * 1000, 2) for name, seconds in trace.stages.items()
+    }
+    slow_requests: deque = stats["slow_requests"]
+    slow_requests.append(
+        {
+            "time": time.time(),
+            "device_id": trace.device_id,
+            "command": trace.command,
+            "items": trace.items,
+            "total_ms": round(trace.total * 1000, 2),
+            "stages_ms": breakdown,
+        }
+    )
+    _LOGGER.warning(
+        "Slow %s request from device %s (%d items): %.1f ms %s",
+        trace.command,
+        trace.device_id,
+        trace.items,
+        trace.total * 1000,
+        breakdown,
+    )
+
+
+def new_request_stats() -> dict[str, Any]:
+    """Return an empty request stats container."""
+    return {"devices": {}, "slow_requests": deque(maxlen=SLOW_REQUEST_HISTORY)}
@@ -0,0 +1,273 @@
+"""Cheap structural validation of Desktop App webhook payloads.
+
+Every check here is bounded by the configured limits rather than by the size
+of the payload, so an oversized or deeply nested body is rejected after a
+fixed amount of work instead of stalling the event loop.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any, NamedTuple
+
+from aiohttp.web import Response
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    ATTR_SENSOR_ATTRIBUTES,
+    ATTR_SENSOR_DEVICE_CLASS,
+    ATTR_SENSOR_ENTITY_CATEGORY,
+    ATTR_SENSOR_ICON,
+    ATTR_SENSOR_NAME,
+    ATTR_SENSOR_SAMPLES,
+    ATTR_SENSOR_STATE,
+    ATTR_SENSOR_STATE_CLASS,
+    ATTR_SENSOR_TYPE,
+    ATTR_SENSOR_UNIQUE_ID,
+    ATTR_SENSOR_UNIT_OF_MEASUREMENT,
+    DATA_REJECTIONS,
+    DOMAIN,
+    MAX_ATTRIBUTE_DEPTH,
+    MAX_ATTRIBUTE_ITEMS,
+    MAX_BACKFILL_SAMPLES,
+    MAX_SENSORS_PER_REQUEST,
+    MAX_STATE_LENGTH,
+    MAX_STRING_LENGTH,
+    MAX_WEBHOOK_BODY_SIZE,
+)
+from .helpers import error_response
+
+_LOGGER = logging.getLogger(__name__)
+
+REGISTRATION_STRING_FIELDS = (
+    ATTR_SENSOR_ICON,
+    ATTR_SENSOR_DEVICE_CLASS,
+    ATTR_SENSOR_UNIT_OF_MEASUREMENT,
+    ATTR_SENSOR_STATE_CLASS,
+    ATTR_SENSOR_ENTITY_CATEGORY,
+)
+
+
+class Rejection(NamedTuple):
+    """Why a payload was rejected."""
+
+    reason: str
+    message: str
+    status: int = 400
+
+
+@callback
+def async_reject(hass: HomeAssistant, rejection: Rejection) -> Response:
+    """Count a rejection and build its error response."""
+    rejections: dict[str, int] = hass.data[DOMAIN][DATA_REJECTIONS]
+    rejections[rejection.reason] = rejections.get(rejection.reason, 0) + 1
+    _LOGGER.debug("Rejected payload (%s): %s", rejection.reason, rejection.message)
+    return error_response(rejection.message, status=rejection.status)
+
+
+BODY_TOO_LARGE = Rejection(
+    "body_too_large", f"Request body exceeds {MAX_WEBHOOK_BODY_SIZE} bytes", 413
+)
+
+
+def check_body_size(content_length: int | None) -> Rejection | None:
+    """Reject a request body before it is read when it is too large.
+
+    Chunked requests carry no length; async_read_json enforces the limit on
+    the bytes it reads.
+    """
+    if content_length is not None and content_length > MAX_WEBHOOK_BODY_SIZE:
+        return BODY_TOO_LARGE
+    return None
+
+
+def check_command(data: Any) -> Rejection | None:
+    """Check the envelope of a webhook body before it is dispatched."""
+    if not isinstance(data, dict):
+        return Rejection("invalid_body", "Body must be a JSON object")
+    command_type = data.get("type")
+    if not command_type:
+        return Rejection("invalid_body", "Missing 'type' field")
+    if not isinstance(command_type, str):
+        return Rejection("invalid_body", "'type' must be a string")
+    if not isinstance(data.get("data", {}), dict):
+        return Rejection("invalid_body", "'data' must be an object")
+    return None
+
+
+def check_attributes(value: Any) -> Rejection | None:
+    """Check the nesting depth, item count and string lengths of attributes."""
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        return Rejection(
+            "invalid_attributes", f"'{ATTR_SENSOR_ATTRIBUTES}' must be an object"
+        )
+
+    # Iterative walk; containers are only expanded while the total number of
+    # items seen stays within budget, so huge inputs are rejected early.
+    items = 0
+    stack: list[tuple[Any, int]] = [(value, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, str):
+            if len(node) > MAX_STRING_LENGTH:
+                return Rejection(
+                    "string_too_long",
+                    f"Attribute values are limited to {MAX_STRING_LENGTH} chars",
+                )
+        elif isinstance(node, (dict, list)):
+            if depth >= MAX_ATTRIBUTE_DEPTH:
+                return Rejection(
+                    "attributes_too_deep",
+                    f"Attributes are limited to {MAX_ATTRIBUTE_DEPTH} nesting levels",
+                )
+            items += len(node)
+            if items > MAX_ATTRIBUTE_ITEMS:
+                return Rejection(
+                    "attributes_too_large",
+                    f"Attributes are limited to {MAX_ATTRIBUTE_ITEMS} items",
+                )
+            if isinstance(node, dict):
+                for key, child in node.items():
+                    if len(key) > MAX_STRING_LENGTH:
+                        return Rejection(
+                            "string_too_long",
+                            f"Attribute keys are limited to {MAX_STRING_LENGTH} chars",
+                        )
+                    stack.append((child, depth + 1))
+            else:
+                stack.extend((child, depth + 1) for child in node)
+    return None
+
+
+def check_state(value: Any) -> Rejection | None:
+    """Check that a sensor state is a scalar of bounded length."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return None
+    if isinstance(value, str):
+        if len(value) > MAX_STATE_LENGTH:
+            return Rejection(
+                "string_too_long",
+                f"'{ATTR_SENSOR_STATE}' is limited to {MAX_STATE_LENGTH} characters",
+            )
+        return None
+    return Rejection(
+        "invalid_state", f"'{ATTR_SENSOR_STATE}' must be a string, number or boolean"
+    )
+
+
+def _check_string(data: dict[str, Any], field: str) -> Rejection | None:
+    """Check an optional string field."""
+    value = data.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        return Rejection("invalid_field", f"'{field}' must be a string")
+    if len(value) > MAX_STRING_LENGTH:
+        return Rejection(
+            "string_too_long",
+            f"'{field}' is limited to {MAX_STRING_LENGTH} characters",
+        )
+    return None
+
+
+def check_sensor_updates(sensor_states: list[Any]) -> Rejection | None:
+    """Validate the 'sensors' list of update_sensor_states."""
+    if len(sensor_states) > MAX_SENSORS_PER_REQUEST:
+        return Rejection(
+            "too_many_sensors",
+            f"At most {MAX_SENSORS_PER_REQUEST} sensors per request",
+            413,
+        )
+
+    for sensor_update in sensor_states:
+        if not isinstance(sensor_update, dict):
+            return Rejection("invalid_sensor", "Each sensor update must be an object")
+        if rejection := (
+            _check_string(sensor_update, ATTR_SENSOR_UNIQUE_ID)
+            or _check_string(sensor_update, ATTR_SENSOR_ICON)
+            or check_state(sensor_update.get(ATTR_SENSOR_STATE))
+            or check_attributes(sensor_update.get(ATTR_SENSOR_ATTRIBUTES))
+        ):
+            return rejection
+    return None
+
+
+def check_sensor_registration(data: dict[str, Any]) -> Rejection | None:
+    """Validate the body of register_sensor."""
+    for field in (ATTR_SENSOR_UNIQUE_ID, ATTR_SENSOR_NAME, ATTR_SENSOR_TYPE):
+        if rejection := _check_string(data, field):
+            return rejection
+    for field in REGISTRATION_STRING_FIELDS:
+        if rejection := _check_string(data, field):
+            return rejection
+    return check_state(data.get(ATTR_SENSOR_STATE)) or check_attributes(
+        data.get(ATTR_SENSOR_ATTRIBUTES)
+    )
+
+
+def _is_number(value: Any) -> bool:
+    """Return True for int/float but not bool."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_finite_number(value: Any) -> bool:
+    """Return True for an int/float that is not bool, NaN or infinite."""
+    return _is_number(value) and math.isfinite(value)
+
+
+def check_backfill(sensors: list[Any], newest: float) -> Rejection | None:
+    """Validate the 'sensors' list of backfill_sensor_states.
+
+    Sample timestamps must not be later than newest.
+    """
+    if len(sensors) > MAX_SENSORS_PER_REQUEST:
+        return Rejection(
+            "too_many_sensors",
+            f"At most {MAX_SENSORS_PER_REQUEST} sensors per request",
+            413,
+        )
+
+    total = 0
+    for sensor in sensors:
+        if not isinstance(sensor, dict):
+            return Rejection("invalid_sensor", "Each sensor backfill must be an object")
+        if not sensor.get(ATTR_SENSOR_UNIQUE_ID):
+            return Rejection(
+                "invalid_sensor", f"Missing required field: {ATTR_SENSOR_UNIQUE_ID}"
+            )
+        if rejection := _check_string(sensor, ATTR_SENSOR_UNIQUE_ID):
+            return rejection
+
+        samples = sensor.get(ATTR_SENSOR_SAMPLES)
+        if not isinstance(samples, list):
+            return Rejection(
+                "invalid_samples", f"'{ATTR_SENSOR_SAMPLES}' must be a list"
+            )
+        total += len(samples)
+        if total > MAX_BACKFILL_SAMPLES:
+            return Rejection(
+                "too_many_samples",
+                f"At most {MAX_BACKFILL_SAMPLES} samples per request",
+                413,
+            )
+        for sample in samples:
+            if not (
+                isinstance(sample, list)
+                and len(sample) == 2
+                and _is_finite_number(sample[0])
+                and _is_finite_number(sample[1])
+            ):
+                return Rejection(
+                    "invalid_samples",
+                    "Each sample must be a [timestamp, number] pair of finite "
+                    "numbers",
+                )
+            if sample[0] > newest:
+                return Rejection(
+                    "sample_out_of_range", "Sample timestamps must not be in the future"
+                )
+    return None
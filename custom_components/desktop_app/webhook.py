@@ -3,36 +3,89 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any, Callable, Coroutine
 
+from aiohttp import hdrs
 from aiohttp.web import Request, Response
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from .const import (
+    ATTR_DEFINITION_HASH,
     ATTR_DEVICE_ID,
+    ATTR_HEARTBEAT_TIMEOUT,
+    ATTR_SEQUENCE,
+    ATTR_SENSOR_AGGREGATION_STATISTIC,
+    ATTR_SENSOR_AGGREGATION_WINDOW,
     ATTR_SENSOR_ATTRIBUTES,
     ATTR_SENSOR_DEVICE_CLASS,
     ATTR_SENSOR_ENTITY_CATEGORY,
+    ATTR_SENSOR_EXPIRE_AFTER,
     ATTR_SENSOR_ICON,
     ATTR_SENSOR_NAME,
+    ATTR_SENSOR_SAMPLES,
     ATTR_SENSOR_STATE,
     ATTR_SENSOR_STATE_CLASS,
     ATTR_SENSOR_TYPE,
     ATTR_SENSOR_UNIQUE_ID,
     ATTR_SENSOR_UNIT_OF_MEASUREMENT,
     ATTR_WEBHOOK_ID,
+    COMMAND_BACKFILL_SENSOR_STATES,
     COMMAND_REGISTER_SENSOR,
     COMMAND_UPDATE_REGISTRATION,
     COMMAND_UPDATE_SENSOR_STATES,
+    DATA_CAPTURE,
     DATA_CONFIG_ENTRIES,
     DATA_PENDING_UPDATES,
+    DATA_REGISTERED_SENSORS,
+    DATA_SENSOR_LAST_SEEN,
+    DATA_SENSOR_SEQUENCES,
+    DATA_SENSORS_BY_DEVICE,
+    DATA_THROTTLE,
     DOMAIN,
+    MIN_AGGREGATION_WINDOW,
     SIGNAL_SENSOR_REGISTER,
     SIGNAL_SENSOR_UPDATE,
 )
-from .helpers import error_response, webhook_response
+from .aggregation import AGGREGATION_STATISTICS
+from .backfill import async_import_backfill, newest_sample_time
+from .capture import SOURCE_WEBHOOK
+from .expiry import async_device_heartbeat, async_track_device_heartbeat
+from .helpers import (
+    BodyTooLargeError,
+    async_read_json,
+    definition_fingerprint,
+    error_response,
+    get_device_sensors,
+    is_valid_timeout,
+    webhook_response,
+)
+from .snapshot import async_get_device_state_index
+from .throttle import DeviceThrottle, SensorUpdate
+from .tracing import (
+    CURRENT_TRACE,
+    STAGE_DISPATCH,
+    STAGE_ENTRY_LOOKUP,
+    STAGE_JSON_PARSE,
+    STAGE_VALIDATION,
+    RequestTrace,
+    async_record_trace,
+    set_trace_info,
+    trace_stage,
+)
+from .validation import (
+    BODY_TOO_LARGE,
+    Rejection,
+    async_reject,
+    check_backfill,
+    check_body_size,
+    check_command,
+    check_sensor_registration,
+    check_sensor_updates,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -52,41 +105,127 @@ def webhook_command(command_type: str):
     return decorator
 
 
+def request_cost(data: Any) -> int:
+    """Return the budget tokens a command body costs.
+
+    One token per sensor and at least one. A backfill is charged per sensor
+    too: it writes at most one state per sensor, and its samples become
+    statistics rows off the request path.
+    """
+    if not isinstance(data, dict) or not isinstance(
+        sensors := data.get("sensors"), list
+    ):
+        return 1
+    return len(sensors)
+
+
 async def handle_webhook(
     hass: HomeAssistant, webhook_id: str, request: Request
 ) -> Response:
     """Handle incoming webhook requests from the Desktop App."""
+    trace = RequestTrace()
+    token = CURRENT_TRACE.set(trace)
     try:
-        data: dict[str, Any] = await request.json()
-    except ValueError:
-        return error_response("Invalid JSON", status=400)
+        return await _async_handle_webhook(hass, webhook_id, request)
+    finally:
+        CURRENT_TRACE.reset(token)
+        async_record_trace(hass, trace)
+
+
+async def _async_handle_webhook(
+    hass: HomeAssistant, webhook_id: str, request: Request
+) -> Response:
+    """Parse a webhook request and run it."""
+    with trace_stage(STAGE_VALIDATION):
+        if rejection := check_body_size(request.content_length):
+            return async_reject(hass, rejection)
 
-    command_type = data.get("type")
-    if not command_type:
-        return error_response("Missing 'type' field", status=400)
+    with trace_stage(STAGE_JSON_PARSE):
+        try:
+            data: dict[str, Any] = await async_read_json(hass, request)
+        except BodyTooLargeError:
+            return async_reject(hass, BODY_TOO_LARGE)
+        except ValueError:
+            return error_response("Invalid JSON", status=400)
 
+    with trace_stage(STAGE_ENTRY_LOOKUP):
+        config_entry = find_config_entry(hass, webhook_id)
+
+    return await async_handle_command(hass, config_entry, webhook_id, data)
+
+
+def find_config_entry(hass: HomeAssistant, webhook_id: str) -> dict[str, Any] | None:
+    """Return the stored registration that owns a webhook_id."""
+    for entry_data in hass.data[DOMAIN][DATA_CONFIG_ENTRIES].values():
+        if entry_data.get(ATTR_WEBHOOK_ID) == webhook_id:
+            return entry_data
+    return None
+
+
+async def async_handle_command(
+    hass: HomeAssistant,
+    config_entry: dict[str, Any] | None,
+    webhook_id: str,
+    data: Any,
+    source: str = SOURCE_WEBHOOK,
+) -> Response:
+    """Validate a decoded webhook body and run its command handler.
+
+    The source tells a traffic capture whether the body came from a device
+    webhook or a relay batch.
+    """
+    # A malformed body is still captured, so a replay reproduces it
+    with trace_stage(STAGE_VALIDATION):
+        rejection = check_command(data)
+    if (capture := hass.data[DOMAIN][DATA_CAPTURE]) is not None:
+        capture.async_record(
+            source,
+            config_entry[ATTR_DEVICE_ID] if config_entry else webhook_id,
+            None if rejection else data["type"],
+            data,
+        )
+    if rejection:
+        return async_reject(hass, rejection)
+
+    command_type = data["type"]
     handler = WEBHOOK_COMMANDS.get(command_type)
     if handler is None:
         _LOGGER.warning("Unknown webhook command type: %s", command_type)
         return error_response(f"Unknown command type: {command_type}", status=400)
 
-    # Find the config entry for this webhook
-    config_entry = None
-    for entry_id, entry_data in hass.data[DOMAIN][DATA_CONFIG_ENTRIES].items():
-        if entry_data.get(ATTR_WEBHOOK_ID) == webhook_id:
-            config_entry = entry_data
-            break
-
     if config_entry is None:
         return error_response("Device not registered", status=410)
 
+    set_trace_info(device_id=config_entry[ATTR_DEVICE_ID], command=command_type)
+
+    # Every request counts as a heartbeat
+    async_device_heartbeat(hass, config_entry[ATTR_DEVICE_ID])
+
+    # Sensor updates charge the budget after validation, so an over-budget
+    # batch can be deferred instead of refused
+    payload = data.get("data", {})
+    if command_type != COMMAND_UPDATE_SENSOR_STATES:
+        device_id = config_entry[ATTR_DEVICE_ID]
+        throttle: DeviceThrottle = hass.data[DOMAIN][DATA_THROTTLE]
+        retry_after = throttle.async_acquire(
+            device_id, request_cost(payload)
+        )
+        if retry_after is not None:
+            throttle.async_count_rejection(device_id)
+            response = async_reject(
+                hass,
+                Rejection("over_budget", "Device is over its request budget", 429),
+            )
+            response.headers[hdrs.RETRY_AFTER] = str(retry_after)
+            return response
+
     _LOGGER.debug(
         "Handling webhook command '%s' for device %s",
         command_type,
         config_entry.get(ATTR_DEVICE_ID, "unknown"),
     )
 
-    return await handler(hass, config_entry, webhook_id, data.get("data", {}))
+    return await handler(hass, config_entry, webhook_id, payload)
 
 
 @webhook_command(COMMAND_REGISTER_SENSOR)
@@ -102,6 +241,12 @@ async def handle_register_sensor(
         if field not in data:
             return error_response(f"Missing required field: {field}", status=400)
 
+    set_trace_info(items=1)
+    with trace_stage(STAGE_VALIDATION):
+        rejection = check_sensor_registration(data)
+    if rejection:
+        return async_reject(hass, rejection)
+
     sensor_type = data[ATTR_SENSOR_TYPE]
     if sensor_type not in ("sensor", "binary_sensor"):
         return error_response(
@@ -109,10 +254,74 @@ async def handle_register_sensor(
             status=400,
         )
 
+    expire_after = data.get(ATTR_SENSOR_EXPIRE_AFTER)
+    if expire_after is not None and not is_valid_timeout(expire_after):
+        return error_response(
+            f"Invalid {ATTR_SENSOR_EXPIRE_AFTER}: must be a non-negative number",
+            status=400,
+        )
+
+    aggregation_window = data.get(ATTR_SENSOR_AGGREGATION_WINDOW)
+    aggregation_statistic = data.get(ATTR_SENSOR_AGGREGATION_STATISTIC)
+    if aggregation_window is not None:
+        if sensor_type != "sensor":
+            return error_response(
+                "Aggregation is only supported for sensors", status=400
+            )
+        if (
+            not is_valid_timeout(aggregation_window)
+            or aggregation_window < MIN_AGGREGATION_WINDOW
+        ):
+            return error_response(
+                f"Invalid {ATTR_SENSOR_AGGREGATION_WINDOW}: must be a number of "
+                f"seconds >= {MIN_AGGREGATION_WINDOW}",
+                status=400,
+            )
+        if (
+            aggregation_statistic is not None
+            and aggregation_statistic not in AGGREGATION_STATISTICS
+        ):
+            return error_response(
+                f"Invalid {ATTR_SENSOR_AGGREGATION_STATISTIC}: must be one of "
+                f"{', '.join(AGGREGATION_STATISTICS)}",
+                status=400,
+            )
+
     device_id = config_entry[ATTR_DEVICE_ID]
     sensor_unique_id = data[ATTR_SENSOR_UNIQUE_ID]
     unique_store_key = f"{device_id}_{sensor_unique_id}"
 
+    # Clients re-register every sensor on each launch; an identical
+    # definition needs neither a store write nor a dispatcher signal. The
+    # state sent along is applied like an update.
+    definition_hash = definition_fingerprint(data)
+    stored = get_device_sensors(hass, device_id).get(unique_store_key)
+    if stored is not None and stored.get(ATTR_DEFINITION_HASH) == definition_hash:
+        hass.data[DOMAIN][DATA_SENSOR_LAST_SEEN][unique_store_key] = time.time()
+        if ATTR_SENSOR_STATE in data:
+            async_apply_sensor_updates(
+                hass,
+                config_entry,
+                webhook_id,
+                [
+                    (
+                        {
+                            ATTR_SENSOR_UNIQUE_ID: sensor_unique_id,
+                            ATTR_SENSOR_STATE: data[ATTR_SENSOR_STATE],
+                            ATTR_SENSOR_ICON: data.get(ATTR_SENSOR_ICON),
+                            ATTR_SENSOR_ATTRIBUTES: data.get(
+                                ATTR_SENSOR_ATTRIBUTES, {}
+                            ),
+                        },
+                        None,
+                    )
+                ],
+            )
+        _LOGGER.debug(
+            "Sensor '%s' for device %s is unchanged", sensor_unique_id, device_id
+        )
+        return webhook_response({"success": True, "unchanged": True})
+
     sensor_data = {
         ATTR_SENSOR_UNIQUE_ID: sensor_unique_id,
         ATTR_SENSOR_NAME: data[ATTR_SENSOR_NAME],
@@ -124,21 +333,30 @@ async def handle_register_sensor(
         ATTR_SENSOR_STATE_CLASS: data.get(ATTR_SENSOR_STATE_CLASS),
         ATTR_SENSOR_ENTITY_CATEGORY: data.get(ATTR_SENSOR_ENTITY_CATEGORY),
         ATTR_SENSOR_ATTRIBUTES: data.get(ATTR_SENSOR_ATTRIBUTES, {}),
+        ATTR_SENSOR_EXPIRE_AFTER: expire_after,
+        ATTR_SENSOR_AGGREGATION_WINDOW: aggregation_window,
+        ATTR_SENSOR_AGGREGATION_STATISTIC: aggregation_statistic,
         "unique_store_key": unique_store_key,
         ATTR_DEVICE_ID: device_id,
+        ATTR_DEFINITION_HASH: definition_hash,
     }
 
     # Store sensor registration
-    devices = hass.data[DOMAIN].setdefault("registered_sensors", {})
+    devices = hass.data[DOMAIN].setdefault(DATA_REGISTERED_SENSORS, {})
     devices[unique_store_key] = sensor_data
+    hass.data[DOMAIN][DATA_SENSORS_BY_DEVICE].setdefault(device_id, {})[
+        unique_store_key
+    ] = sensor_data
+    hass.data[DOMAIN][DATA_SENSOR_LAST_SEEN][unique_store_key] = time.time()
 
     # Persist to store so sensors survive HA restarts
     from . import _async_save_store
     await _async_save_store(hass)
 
     # Dispatch signal for dynamic entity creation
-    signal = SIGNAL_SENSOR_REGISTER.format(device_id, sensor_type)
-    async_dispatcher_send(hass, signal, sensor_data)
+    with trace_stage(STAGE_DISPATCH):
+        signal = SIGNAL_SENSOR_REGISTER.format(device_id, sensor_type)
+        async_dispatcher_send(hass, signal, sensor_data)
 
     _LOGGER.info(
         "Registered sensor '%s' (%s) for device %s",
@@ -162,36 +380,212 @@ async def handle_update_sensor_states(
     if not isinstance(sensor_states, list):
         return error_response("'sensors' must be a list", status=400)
 
+    # Reject the whole request before any state is touched
+    set_trace_info(items=len(sensor_states))
+    with trace_stage(STAGE_VALIDATION):
+        rejection = check_sensor_updates(sensor_states)
+    if rejection:
+        return async_reject(hass, rejection)
+
+    sequence = data.get(ATTR_SEQUENCE)
+    if sequence is not None and (
+        not isinstance(sequence, (int, float)) or isinstance(sequence, bool)
+    ):
+        return error_response(f"'{ATTR_SEQUENCE}' must be a number", status=400)
+
     device_id = config_entry[ATTR_DEVICE_ID]
-    pending = hass.data[DOMAIN][DATA_PENDING_UPDATES].setdefault(webhook_id, {})
+    throttle: DeviceThrottle = hass.data[DOMAIN][DATA_THROTTLE]
+    retry_after = throttle.async_acquire(
+        device_id, len(sensor_states), sensor_updates=True
+    )
+    if retry_after is not None:
+        throttle.async_defer(config_entry, webhook_id, sensor_states, sequence)
+        response = webhook_response({"success": True, "deferred": True})
+        response.headers[hdrs.RETRY_AFTER] = str(retry_after)
+        return response
+
+    stale = async_apply_sensor_updates(
+        hass,
+        config_entry,
+        webhook_id,
+        [(sensor_update, sequence) for sensor_update in sensor_states],
+    )
+
+    _LOGGER.debug(
+        "Updated %d sensor states for device %s",
+        len(sensor_states) - len(stale),
+        device_id,
+    )
 
-    for sensor_update in sensor_states:
-        sensor_unique_id = sensor_update.get(ATTR_SENSOR_UNIQUE_ID)
-        if not sensor_unique_id:
-            continue
+    if stale:
+        _LOGGER.debug(
+            "Discarded %d stale sensor updates (sequence %s) for device %s",
+            len(stale),
+            sequence,
+            device_id,
+        )
+        return webhook_response({"success": True, "stale": stale})
 
-        unique_store_key = f"{device_id}_{sensor_unique_id}"
+    return webhook_response({"success": True})
 
-        update_data = {
-            ATTR_SENSOR_STATE: sensor_update.get(ATTR_SENSOR_STATE),
-            ATTR_SENSOR_ICON: sensor_update.get(ATTR_SENSOR_ICON),
-            ATTR_SENSOR_ATTRIBUTES: sensor_update.get(ATTR_SENSOR_ATTRIBUTES, {}),
-        }
 
-        # Buffer in pending updates
-        pending[unique_store_key] = update_data
+@callback
+def async_apply_sensor_updates(
+    hass: HomeAssistant,
+    config_entry: dict[str, Any],
+    webhook_id: str,
+    updates: list[SensorUpdate],
+) -> list[str]:
+    """Buffer and dispatch validated sensor updates; return the stale ones.
+
+    Each update comes with the sequence of the request it arrived in.
+    """
+    device_id = config_entry[ATTR_DEVICE_ID]
+    pending = hass.data[DOMAIN][DATA_PENDING_UPDATES].setdefault(webhook_id, {})
+    device_sensors = get_device_sensors(hass, device_id)
+    last_seen: dict[str, float] = hass.data[DOMAIN][DATA_SENSOR_LAST_SEEN]
+    now = time.time()
+    state_index = async_get_device_state_index(hass, device_id)
+    last_sequences: dict[str, float] | None = None
+    stale: list[str] = []
+
+    with trace_stage(STAGE_DISPATCH):
+        for sensor_update, sequence in updates:
+            sensor_unique_id = sensor_update.get(ATTR_SENSOR_UNIQUE_ID)
+            if not sensor_unique_id:
+                continue
+
+            # Requests may be pipelined and arrive out of order; never let an
+            # older value overwrite a newer one.
+            if sequence is not None:
+                if last_sequences is None:
+                    last_sequences = hass.data[DOMAIN][
+                        DATA_SENSOR_SEQUENCES
+                    ].setdefault(device_id, {})
+                if sequence < last_sequences.get(sensor_unique_id, sequence):
+                    stale.append(sensor_unique_id)
+                    continue
+                last_sequences[sensor_unique_id] = sequence
+
+            unique_store_key = f"{device_id}_{sensor_unique_id}"
+
+            update_data = {
+                ATTR_SENSOR_STATE: sensor_update.get(ATTR_SENSOR_STATE),
+                ATTR_SENSOR_ICON: sensor_update.get(ATTR_SENSOR_ICON),
+                ATTR_SENSOR_ATTRIBUTES: sensor_update.get(ATTR_SENSOR_ATTRIBUTES, {}),
+            }
+
+            # Buffer in pending updates
+            pending[unique_store_key] = update_data
+            if (sensor_data := device_sensors.get(unique_store_key)) is not None:
+                last_seen[unique_store_key] = now
+                # Entities start from this on the next boot instead of
+                # looking the value up in the restore cache
+                sensor_data[ATTR_SENSOR_STATE] = update_data[ATTR_SENSOR_STATE]
+                state_index.update(
+                    sensor_unique_id,
+                    update_data[ATTR_SENSOR_STATE],
+                    update_data[ATTR_SENSOR_ICON],
+                    update_data[ATTR_SENSOR_ATTRIBUTES],
+                    received_at=now,
+                )
+
+            # Dispatch signal to individual entity
+            signal = SIGNAL_SENSOR_UPDATE.format(device_id, sensor_unique_id)
+            async_dispatcher_send(hass, signal, update_data)
+
+    return stale
+
+
+@webhook_command(COMMAND_BACKFILL_SENSOR_STATES)
+async def handle_backfill_sensor_states(
+    hass: HomeAssistant,
+    config_entry: dict[str, Any],
+    webhook_id: str,
+    data: dict[str, Any],
+) -> Response:
+    """Apply the newest buffered sample live and import the rest as statistics."""
+    sensors = data.get("sensors", [])
+    if not isinstance(sensors, list):
+        return error_response("'sensors' must be a list", status=400)
+
+    set_trace_info(items=len(sensors))
+    with trace_stage(STAGE_VALIDATION):
+        rejection = check_backfill(sensors, newest_sample_time())
+    if rejection:
+        return async_reject(hass, rejection)
 
-        # Dispatch signal to individual entity
-        signal = SIGNAL_SENSOR_UPDATE.format(device_id, sensor_unique_id)
-        async_dispatcher_send(hass, signal, update_data)
+    device_id = config_entry[ATTR_DEVICE_ID]
+    pending = hass.data[DOMAIN][DATA_PENDING_UPDATES].setdefault(webhook_id, {})
+    device_sensors = get_device_sensors(hass, device_id)
+    last_seen: dict[str, float] = hass.data[DOMAIN][DATA_SENSOR_LAST_SEEN]
+    now = time.time()
+    state_index = async_get_device_state_index(hass, device_id)
+    entity_registry = er.async_get(hass)
+    recorder_loaded = "recorder" in hass.config.components
+    imported: list[str] = []
+
+    with trace_stage(STAGE_DISPATCH):
+        for sensor in sensors:
+            samples = sensor[ATTR_SENSOR_SAMPLES]
+            if not samples:
+                continue
+
+            sensor_unique_id = sensor[ATTR_SENSOR_UNIQUE_ID]
+            unique_store_key = f"{device_id}_{sensor_unique_id}"
+            sensor_data = device_sensors.get(unique_store_key)
+            if sensor_data is not None:
+                last_seen[unique_store_key] = now
+
+            # Only the newest sample becomes a state change, and only if no
+            # newer live value arrived while the client was buffering
+            newest_timestamp, newest_value = max(samples)
+            received_at = state_index.received_at(sensor_unique_id)
+            if received_at is None or newest_timestamp >= received_at:
+                update_data = {ATTR_SENSOR_STATE: newest_value}
+                pending[unique_store_key] = update_data
+                signal = SIGNAL_SENSOR_UPDATE.format(device_id, sensor_unique_id)
+                async_dispatcher_send(hass, signal, update_data)
+                if sensor_data is not None:
+                    sensor_data[ATTR_SENSOR_STATE] = newest_value
+                    state_index.update(
+                        sensor_unique_id, newest_value, received_at=newest_timestamp
+                    )
+
+            # The backlog goes straight to long-term statistics, which only
+            # makes sense for measurement sensors
+            if (
+                not recorder_loaded
+                or sensor_data is None
+                or sensor_data.get(ATTR_SENSOR_STATE_CLASS) != "measurement"
+                or (
+                    entity_id := entity_registry.async_get_entity_id(
+                        "sensor", DOMAIN, unique_store_key
+                    )
+                )
+                is None
+            ):
+                continue
+
+            hass.async_create_background_task(
+                async_import_backfill(
+                    hass,
+                    entity_id,
+                    sensor_data.get(ATTR_SENSOR_UNIT_OF_MEASUREMENT),
+                    samples,
+                ),
+                f"{DOMAIN} backfill {entity_id}",
+            )
+            imported.append(sensor_unique_id)
 
     _LOGGER.debug(
-        "Updated %d sensor states for device %s",
-        len(sensor_states),
+        "Backfilled %d sensors for device %s, importing statistics for %d",
+        len(sensors),
         device_id,
+        len(imported),
     )
 
-    return webhook_response({"success": True})
+    return webhook_response({"success": True, "imported": imported})
 
 
 @webhook_command(COMMAND_UPDATE_REGISTRATION)
@@ -204,11 +598,35 @@ async def handle_update_registration(
     """Update device registration info."""
     device_id = config_entry[ATTR_DEVICE_ID]
 
+    heartbeat_timeout = data.get(ATTR_HEARTBEAT_TIMEOUT)
+    if heartbeat_timeout is not None and not is_valid_timeout(heartbeat_timeout):
+        return error_response(
+            f"Invalid {ATTR_HEARTBEAT_TIMEOUT}: must be a non-negative number",
+            status=400,
+        )
+
     # Update allowed fields
-    updatable_fields = ["os_version", "app_version", "device_name"]
-    for field in updatable_fields:
-        if field in data:
-            config_entry[field] = data[field]
+    updatable_fields = [
+        "os_version",
+        "app_version",
+        "device_name",
+        ATTR_HEARTBEAT_TIMEOUT,
+    ]
+    changes = {field: data[field] for field in updatable_fields if field in data}
+    config_entry.update(changes)
+
+    # Setup rebuilds the stored copy from the config entry, so the entry
+    # itself has to change for the update to survive a restart
+    for entry_id, entry_data in hass.data[DOMAIN][DATA_CONFIG_ENTRIES].items():
+        if entry_data is config_entry:
+            if (entry := hass.config_entries.async_get_entry(entry_id)) is not None:
+                hass.config_entries.async_update_entry(
+                    entry, data={**entry.data, **changes}
+                )
+            break
+
+    if ATTR_HEARTBEAT_TIMEOUT in data:
+        async_track_device_heartbeat(hass, config_entry)
 
     # Save store
     from . import _async_save_store
@@ -0,0 +1,107 @@
+"""Measure how long JSON decoding of webhook bodies blocks the event loop.
+
+Builds attribute-heavy update_sensor_states bodies of several sizes and
+decodes them on an event loop, once inline and once in the default thread
+pool, while a probe task measures how late the loop wakes it up. The worst
+delay is the longest stretch during which nothing else on the loop could
+run. Home Assistant decodes with orjson; the script falls back to the
+standard library if orjson is not installed.
+
+Usage:
+    python scripts/benchmark_json_decode.py [--sizes 64,256,1024,4096,8000] [--rounds 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+PROBE_INTERVAL = 0.001
+
+
+def build_body(size_kib: int) -> bytes:
+    """Return an update_sensor_states body of roughly the given size."""
+    sensors = []
+    body = b""
+    while len(body) < size_kib * 1024:
+        index = len(sensors)
+        sensors.append(
+            {
+                "sensor_unique_id": f"sensor_{index}",
+                "sensor_state": index * 0.5,
+                "sensor_icon": "mdi:gauge",
+                "sensor_attributes": {
+                    f"attribute_{attribute}": f"value {attribute} of sensor {index}"
+                    for attribute in range(40)
+                },
+            }
+        )
+        if index % 50 == 0:
+            body = json.dumps(
+                {"type": "update_sensor_states", "data": {"sensors": sensors}}
+            ).encode()
+    return body
+
+
+async def measure(body: bytes, rounds: int, offload: bool) -> tuple[float, float]:
+    """Decode the body repeatedly; return the worst loop delay and mean time."""
+    loop = asyncio.get_running_loop()
+    worst_delay = 0.0
+    done = False
+
+    async def probe() -> None:
+        nonlocal worst_delay
+        while not done:
+            expected = time.perf_counter() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            worst_delay = max(worst_delay, time.perf_counter() - expected)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(PROBE_INTERVAL * 5)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if offload:
+            await loop.run_in_executor(None, json_loads, body)
+        else:
+            json_loads(body)
+        # Give the probe a chance to run between requests, as the loop would
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    done = True
+    await probe_task
+    return worst_delay, elapsed / rounds
+
+
+async def main(sizes: list[int], rounds: int) -> None:
+    """Print the worst loop delay per body size, inline and offloaded."""
+    print(f"decoder: {json_loads.__module__}.{json_loads.__name__}")
+    print(f"{'size':>10} {'inline block':>14} {'offload block':>14} {'decode':>10}")
+    for size_kib in sizes:
+        body = build_body(size_kib)
+        inline_delay, decode_time = await measure(body, rounds, offload=False)
+        offload_delay, _ = await measure(body, rounds, offload=True)
+        print(
+            f"{len(body) / 1024:>8.0f} K"
+            f" {inline_delay * 1000:>11.2f} ms"
+            f" {offload_delay * 1000:>11.2f} ms"
+            f" {decode_time * 1000:>7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="64,256,1024,4096,8000")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(
+        main([int(size) for size in args.sizes.split(",")], args.rounds)
+    )
@@ -0,0 +1,192 @@
+"""Measure the integration's own share of a cold start for a large fleet.
+
+Builds the same synthetic fleet as generate_fleet_config.py and times the
+work the integration does per config entry at startup, once the way it used
+to and once the way it does now:
+
+- sensor lookup: every platform of every entry scanning the sensors of the
+  whole fleet, against one index by device built at load.
+- store writes: the whole store serialized once per entry on every boot,
+  against no write when nothing changed.
+- restore: one awaited restore-cache lookup per entity, against seeding the
+  entity from the last value kept in its stored definition.
+
+Only the integration's side is timed; creating entities and writing their
+states is Home Assistant's work and is the same either way. Boot a real
+instance on a generated config directory and read the "Desktop App startup:"
+log line for the full per-phase timings. Home Assistant stores JSON with
+orjson; the script falls back to the standard library if orjson is not
+installed.
+
+Usage:
+    python scripts/benchmark_startup.py [--devices 500] [--sensors 50] [--rounds 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+from generate_fleet_config import build_fleet
+
+try:
+    from orjson import dumps as json_dumps
+except ImportError:
+
+    def json_dumps(data: Any) -> bytes:
+        """Serialize like orjson would."""
+        return json.dumps(data).encode()
+
+
+PLATFORMS = ("sensor", "binary_sensor")
+
+
+def lookup_scan(registered_sensors: dict, device_ids: list[str]) -> int:
+    """Find each device's sensors by scanning the whole fleet per platform."""
+    found = 0
+    for device_id in device_ids:
+        for platform in PLATFORMS:
+            for sensor_data in registered_sensors.values():
+                if (
+                    sensor_data["device_id"] == device_id
+                    and sensor_data["sensor_type"] == platform
+                ):
+                    found += 1
+    return found
+
+
+def lookup_index(registered_sensors: dict, device_ids: list[str]) -> int:
+    """Find each device's sensors through an index built once."""
+    index: dict[str, dict[str, dict]] = {}
+    for key, sensor_data in registered_sensors.items():
+        index.setdefault(sensor_data["device_id"], {})[key] = sensor_data
+    found = 0
+    for device_id in device_ids:
+        device_sensors = index.get(device_id, {})
+        for platform in PLATFORMS:
+            for sensor_data in device_sensors.values():
+                if sensor_data["sensor_type"] == platform:
+                    found += 1
+    return found
+
+
+def store_write_per_entry(store_data: dict, entries: int) -> int:
+    """Serialize the whole store once per config entry."""
+    return sum(len(json_dumps(store_data)) for _ in range(entries))
+
+
+class StoredState:
+    """Stand-in for a restore-cache entry."""
+
+    __slots__ = ("state",)
+
+    def __init__(self, state: str) -> None:
+        """Initialize the entry."""
+        self.state = state
+
+
+async def restore_from_cache(
+    registered_sensors: dict, last_states: dict[str, StoredState]
+) -> int:
+    """Await one restore-cache lookup per entity, like RestoreEntity does."""
+
+    async def async_get_last_state(entity_id: str) -> StoredState | None:
+        return last_states.get(entity_id)
+
+    restored = 0
+    for key in registered_sensors:
+        if (last_state := await async_get_last_state(f"sensor.{key}")) is not None:
+            restored += last_state.state is not None
+    return restored
+
+
+async def restore_from_definitions(
+    registered_sensors: dict, last_states: dict[str, StoredState]
+) -> int:
+    """Seed entities from their stored definitions; fall back to the cache."""
+
+    async def async_get_last_state(entity_id: str) -> StoredState | None:
+        return last_states.get(entity_id)
+
+    restored = 0
+    for key, sensor_data in registered_sensors.items():
+        if sensor_data.get("sensor_state") is not None:
+            restored += 1
+        elif (last_state := await async_get_last_state(f"sensor.{key}")) is not None:
+            restored += last_state.state is not None
+    return restored
+
+
+def best_of(rounds: int, func, *args) -> float:
+    """Return the fastest of several timed runs in seconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the measurements and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--sensors", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    entries, store_data = build_fleet(args.devices, args.sensors)
+    registered_sensors = store_data["registered_sensors"]
+    device_ids = [entry["data"]["device_id"] for entry in entries]
+    last_states = {
+        f"sensor.{key}": StoredState(str(sensor_data["sensor_state"]))
+        for key, sensor_data in registered_sensors.items()
+    }
+    loop = asyncio.new_event_loop()
+
+    rows = [
+        (
+            "sensor lookup",
+            best_of(args.rounds, lookup_scan, registered_sensors, device_ids),
+            best_of(args.rounds, lookup_index, registered_sensors, device_ids),
+        ),
+        (
+            "store writes",
+            best_of(args.rounds, store_write_per_entry, store_data, len(entries)),
+            0.0,
+        ),
+        (
+            "restore",
+            best_of(
+                args.rounds,
+                lambda: loop.run_until_complete(
+                    restore_from_cache(registered_sensors, last_states)
+                ),
+            ),
+            best_of(
+                args.rounds,
+                lambda: loop.run_until_complete(
+                    restore_from_definitions(registered_sensors, last_states)
+                ),
+            ),
+        ),
+    ]
+    loop.close()
+
+    print(
+        f"{args.devices} devices x {args.sensors} sensors, "
+        f"best of {args.rounds} rounds"
+    )
+    print(f"{'phase':<16} {'before':>12} {'after':>12}")
+    for phase, before, after in rows:
+        print(f"{phase:<16} {before * 1000:>9.1f} ms {after * 1000:>9.1f} ms")
+    before_total = sum(row[1] for row in rows)
+    after_total = sum(row[2] for row in rows)
+    print(f"{'total':<16} {before_total * 1000:>9.1f} ms {after_total * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
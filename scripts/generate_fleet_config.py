@@ -0,0 +1,131 @@
+"""Generate a synthetic Home Assistant config directory for startup benchmarks.
+
+Writes the desktop_app store and matching config entries for a fleet of
+devices so a local Home Assistant instance boots with every device already
+registered. Start it with this integration installed and look for the
+"Desktop App startup:" log line for the per-phase timings.
+
+Usage:
+    python scripts/generate_fleet_config.py CONFIG_DIR [--devices 500] [--sensors 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import secrets
+import uuid
+from pathlib import Path
+
+DOMAIN = "desktop_app"
+STORAGE_KEY = "desktop_app_registrations"
+
+
+def build_fleet(devices: int, sensors: int) -> tuple[list[dict], dict]:
+    """Return the config entries and store data for a synthetic fleet."""
+    entries = []
+    config_entries = {}
+    registered_sensors = {}
+
+    for device_index in range(devices):
+        device_id = str(uuid.uuid4())
+        entry_id = uuid.uuid4().hex
+        registration = {
+            "device_id": device_id,
+            "device_name": f"Bench Desktop {device_index:04d}",
+            "webhook_id": secrets.token_hex(32),
+            "manufacturer": "Bench",
+            "model": "Synthetic",
+            "os_name": "Linux",
+            "os_version": "6.0",
+            "app_version": "1.0.0",
+        }
+        entries.append(
+            {
+                "entry_id": entry_id,
+                "version": 1,
+                "domain": DOMAIN,
+                "title": registration["device_name"],
+                "data": registration,
+                "options": {},
+                "pref_disable_new_entities": False,
+                "pref_disable_polling": False,
+                "source": "registration",
+                "unique_id": device_id,
+                "disabled_by": None,
+            }
+        )
+        config_entries[entry_id] = registration
+
+        for sensor_index in range(sensors):
+            # Roughly one in ten sensors is a binary sensor, like real clients
+            is_binary = sensor_index % 10 == 9
+            sensor_unique_id = f"bench_sensor_{sensor_index:03d}"
+            unique_store_key = f"{device_id}_{sensor_unique_id}"
+            registered_sensors[unique_store_key] = {
+                "sensor_unique_id": sensor_unique_id,
+                "sensor_name": f"Bench Sensor {sensor_index:03d}",
+                "sensor_type": "binary_sensor" if is_binary else "sensor",
+                "sensor_state": False if is_binary else float(sensor_index),
+                "sensor_icon": None,
+                "sensor_device_class": None,
+                "sensor_unit_of_measurement": None if is_binary else "%",
+                "sensor_state_class": None if is_binary else "measurement",
+                "sensor_entity_category": None,
+                "sensor_attributes": {},
+                "unique_store_key": unique_store_key,
+                "device_id": device_id,
+            }
+
+    store_data = {
+        "config_entries": config_entries,
+        "devices": {},
+        "deleted_ids": [],
+        "registered_sensors": registered_sensors,
+    }
+    return entries, store_data
+
+
+def main() -> None:
+    """Write the synthetic fleet into CONFIG_DIR/.storage."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("config_dir", type=Path)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--sensors", type=int, default=50)
+    args = parser.parse_args()
+
+    storage_dir = args.config_dir / ".storage"
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    core_entries_path = storage_dir / "core.config_entries"
+    store_path = storage_dir / STORAGE_KEY
+    for path in (core_entries_path, store_path):
+        if path.exists():
+            parser.error(f"{path} already exists; use a fresh config directory")
+
+    entries, store_data = build_fleet(args.devices, args.sensors)
+
+    # minor_version 1 lets Home Assistant migrate the entries to its own
+    # current format on first load.
+    core_entries_path.write_text(
+        json.dumps(
+            {
+                "version": 1,
+                "minor_version": 1,
+                "key": "core.config_entries",
+                "data": {"entries": entries},
+            }
+        )
+    )
+    store_path.write_text(
+        json.dumps(
+            {"version": 1, "minor_version": 1, "key": STORAGE_KEY, "data": store_data}
+        )
+    )
+
+    print(
+        f"Wrote {args.devices} devices x {args.sensors} sensors to {storage_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Replay a Desktop App traffic capture against a local Home Assistant instance.
+
+Reads one or more capture files written by the "Capture traffic" hub option
+(desktop_app_capture.jsonl and its rotated .1, .2, ... files). It registers
+one replay device per captured device and registers the sensors recorded
+when the capture started. It then sends every captured request again and
+reports throughput and latency per command. Relay batches are sent to the
+relay endpoint again, one batch per request.
+
+Requests of one device are sent in order. Different devices run
+concurrently. With --speed 1 the original timing is kept; --speed 10 plays
+ten times as fast; --speed 0 sends as fast as the server answers.
+
+Use a throwaway instance; the replay devices are real registrations. Pass
+--cleanup to remove them afterwards.
+
+Usage:
+    python scripts/replay_capture.py CAPTURE [CAPTURE ...] --token TOKEN \\
+        [--url http://localhost:8123] [--speed 1] [--cleanup]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+import json
+import os
+from pathlib import Path
+import statistics
+import sys
+import time
+
+import aiohttp
+
+DOMAIN = "desktop_app"
+REPLAY_PREFIX = "Replay "
+
+
+def load_capture(paths: list[Path]) -> list[dict]:
+    """Return the records of all capture files, oldest first."""
+    records = []
+    for path in paths:
+        with path.open(encoding="utf-8") as capture_file:
+            records.extend(json.loads(line) for line in capture_file if line.strip())
+    records.sort(key=lambda record: record["time"])
+    return records
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return a percentile of sorted values."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Replay:
+    """Send captured requests and collect their latencies."""
+
+    def __init__(self, session: aiohttp.ClientSession, args: argparse.Namespace):
+        """Initialize the replay."""
+        self.session = session
+        self.args = args
+        self.webhook_ids: dict[str, str] = {}
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[int, int] = defaultdict(int)
+
+    async def _post(self, path: str, body: object) -> tuple[int, dict]:
+        """POST a JSON body and return the status and decoded response."""
+        async with self.session.post(f"{self.args.url}{path}", json=body) as response:
+            if response.content_type == "application/json":
+                return response.status, await response.json()
+            return response.status, {}
+
+    async def register(self, device: str) -> None:
+        """Register a replay device for a captured device pseudonym."""
+        status, response = await self._post(
+            f"/api/{DOMAIN}/registrations",
+            {
+                "device_id": f"replay-{device}",
+                "device_name": f"{REPLAY_PREFIX}{device}",
+            },
+        )
+        if status != 200:
+            raise RuntimeError(f"Registering replay device failed: {status} {response}")
+        self.webhook_ids[device] = response["webhook_id"]
+
+    async def send(self, record: dict) -> None:
+        """Send one captured request and record its latency."""
+        body = record["body"]
+        if record["source"] == "update":
+            path = f"/api/{DOMAIN}/update"
+            if isinstance(body, dict) and "device_id" in body:
+                body = {**body, "device_id": f"replay-{record['device']}"}
+        elif record["source"] == "relay":
+            # The capture keeps each relay batch, not how they were grouped
+            path = f"/api/{DOMAIN}/relay"
+            batch = {
+                key: value
+                for key, value in body.items()
+                if key not in ("device_id", "webhook_id")
+            }
+            batch["webhook_id"] = self.webhook_ids[record["device"]]
+            body = {"batches": [batch]}
+        else:
+            path = f"/api/webhook/{self.webhook_ids[record['device']]}"
+
+        start = time.perf_counter()
+        status, _ = await self._post(path, body)
+        self.latencies[record["command"] or record["source"]].append(
+            time.perf_counter() - start
+        )
+        self.statuses[status] += 1
+
+    async def play_device(
+        self, records: list[dict], first: float, start: float
+    ) -> None:
+        """Send the requests of one device, keeping their order and timing."""
+        for record in records:
+            if self.args.speed:
+                delay = start + (record["time"] - first) / self.args.speed
+                if (wait := delay - time.perf_counter()) > 0:
+                    await asyncio.sleep(wait)
+            await self.send(record)
+
+    async def cleanup(self) -> None:
+        """Remove the replay devices."""
+        async with self.session.get(
+            f"{self.args.url}/api/config/config_entries/entry?domain={DOMAIN}"
+        ) as response:
+            entries = await response.json()
+        for entry in entries:
+            if entry["title"].startswith(REPLAY_PREFIX):
+                async with self.session.delete(
+                    f"{self.args.url}/api/config/config_entries/entry/"
+                    f"{entry['entry_id']}"
+                ):
+                    pass
+
+
+async def main(args: argparse.Namespace) -> int:
+    """Replay the capture and print the report."""
+    records = load_capture(args.capture)
+    if not records:
+        print("The capture is empty", file=sys.stderr)
+        return 1
+
+    snapshot = [record for record in records if record["source"] == "snapshot"]
+    traffic = [record for record in records if record["source"] != "snapshot"]
+    by_device: dict[str, list[dict]] = defaultdict(list)
+    for record in traffic:
+        by_device[record["device"]].append(record)
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        replay = Replay(session, args)
+        devices = {record["device"] for record in records}
+        await asyncio.gather(*(replay.register(device) for device in devices))
+        for record in snapshot:
+            await replay.send(record)
+        replay.latencies.clear()
+        replay.statuses.clear()
+
+        first = traffic[0]["time"] if traffic else 0.0
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                replay.play_device(device_records, first, start)
+                for device_records in by_device.values()
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+        if args.cleanup:
+            await replay.cleanup()
+
+    captured = traffic[-1]["time"] - first if traffic else 0.0
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"{len(traffic)} requests from {len(by_device)} devices in {elapsed:.1f} s "
+        f"(captured over {captured:.1f} s): {len(traffic) / elapsed:.1f} req/s"
+    )
+    print("statuses: " + ", ".join(f"{s}={n}" for s, n in sorted(replay.statuses.items())))
+    print(f"{'command':<24} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for command, latencies in sorted(replay.latencies.items()):
+        latencies.sort()
+        print(
+            f"{command:<24} {len(latencies):>7}"
+            f" {statistics.median(latencies) * 1000:>7.1f}ms"
+            f" {percentile(latencies, 0.95) * 1000:>7.1f}ms"
+            f" {percentile(latencies, 0.99) * 1000:>7.1f}ms"
+            f" {latencies[-1] * 1000:>7.1f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", nargs="+", type=Path)
+    parser.add_argument("--url", default="http://localhost:8123")
+    parser.add_argument("--token", default=os.environ.get("HA_TOKEN"))
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="playback speed factor; 0 sends as fast as possible",
+    )
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("--token or HA_TOKEN is required")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,296 @@
+"""Soak a local Home Assistant instance and fail if Desktop App memory leaks.
+
+Simulates a fleet going through many days of its life at high speed:
+devices register, register their sensors, send batches of updates, go
+quiet long enough to miss their heartbeat, get reloaded, and are removed
+and replaced by new devices. Every few cycles the script runs the
+desktop_app.compact service with the production retention, like the daily
+run does, and reads the hub entry diagnostics. These report the size of
+every structure the integration keeps and the memory traced to its code.
+Compacting with shorter retention would hide exactly the growth this test
+looks for.
+
+The fleet size is the same at every snapshot, so memory retained by the
+integration should stay flat. After a warm-up, the run fails when the
+growth since the end of the warm-up, divided by the live devices or
+sensors, exceeds a budget, or when a structure holds more entries than the
+live fleet needs.
+
+Home Assistant must run with tracemalloc enabled and this integration set
+up (the hub entry added). Use a throwaway instance; the script registers
+and removes devices:
+
+    PYTHONTRACEMALLOC=1 hass -c /tmp/ha-soak
+
+Usage:
+    python scripts/soak_test.py --url http://localhost:8123 --token TOKEN \\
+        [--devices 20] [--sensors 50] [--cycles 300] [--snapshot-every 25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+import aiohttp
+
+DOMAIN = "desktop_app"
+
+
+class Device:
+    """One simulated desktop client."""
+
+    def __init__(self, slot: int, generation: int, sensors: int) -> None:
+        """Initialize the device."""
+        self.device_id = str(uuid.uuid4())
+        self.name = f"Soak {slot:03d}-{generation:04d}"
+        self.sensors = [f"soak_sensor_{index}" for index in range(sensors)]
+        self.webhook_id: str | None = None
+        self.sequence = 0
+
+
+class Soak:
+    """Drive the fleet and collect snapshots."""
+
+    def __init__(self, session: aiohttp.ClientSession, args: argparse.Namespace):
+        """Initialize the soak run."""
+        self.session = session
+        self.args = args
+        self.generation = 0
+        self.devices = [self._new_device(slot) for slot in range(args.devices)]
+        self.requests = 0
+        self.removed = 0
+
+    def _new_device(self, slot: int) -> Device:
+        """Return a device that has not registered yet."""
+        self.generation += 1
+        return Device(slot, self.generation, self.args.sensors)
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        """Send a request to Home Assistant and return the decoded body."""
+        self.requests += 1
+        async with self.session.request(
+            method, f"{self.args.url}{path}", **kwargs
+        ) as response:
+            if response.status >= 400:
+                text = await response.text()
+                raise RuntimeError(f"{method} {path}: {response.status} {text}")
+            if response.content_type == "application/json":
+                return await response.json()
+            return {}
+
+    async def _webhook(self, device: Device, command: str, data: dict) -> None:
+        """Send a webhook command for a device."""
+        await self._request(
+            "POST",
+            f"/api/webhook/{device.webhook_id}",
+            json={"type": command, "data": data},
+        )
+
+    async def register(self, device: Device) -> None:
+        """Register the device and its sensors, like a client launch does."""
+        response = await self._request(
+            "POST",
+            f"/api/{DOMAIN}/registrations",
+            json={
+                "device_id": device.device_id,
+                "device_name": device.name,
+                "heartbeat_timeout": self.args.heartbeat_timeout,
+            },
+        )
+        device.webhook_id = response["webhook_id"]
+        for index, sensor in enumerate(device.sensors):
+            definition = {
+                "sensor_unique_id": sensor,
+                "sensor_name": sensor.replace("_", " "),
+                "sensor_type": "binary_sensor" if index % 5 == 0 else "sensor",
+                "sensor_state": 0,
+            }
+            if index % 3 == 0:
+                definition["sensor_expire_after"] = 30
+            await self._webhook(device, "register_sensor", definition)
+
+    async def update(self, device: Device) -> None:
+        """Send one batch of updates for every sensor of the device."""
+        device.sequence += 1
+        await self._webhook(
+            device,
+            "update_sensor_states",
+            {
+                "sequence": device.sequence,
+                "sensors": [
+                    {
+                        "sensor_unique_id": sensor,
+                        "sensor_state": round(random.random() * 100, 2),
+                        "sensor_attributes": {
+                            "sample": uuid.uuid4().hex,
+                            "values": [random.random() for _ in range(8)],
+                        },
+                    }
+                    for sensor in device.sensors
+                ],
+            },
+        )
+
+    async def entries(self) -> dict[str, str]:
+        """Return the entry_id of every Desktop App entry by title."""
+        entries = await self._request(
+            "GET", f"/api/config/config_entries/entry?domain={DOMAIN}"
+        )
+        return {entry["title"]: entry["entry_id"] for entry in entries}
+
+    async def replace(self, slot: int) -> None:
+        """Remove a device and register a new one in its place."""
+        entry_id = (await self.entries())[self.devices[slot].name]
+        await self._request("DELETE", f"/api/config/config_entries/entry/{entry_id}")
+        self.removed += 1
+        self.devices[slot] = self._new_device(slot)
+        await self.register(self.devices[slot])
+
+    async def reload(self, slot: int) -> None:
+        """Reload a device's entry and let the client register again."""
+        entry_id = (await self.entries())[self.devices[slot].name]
+        await self._request(
+            "POST", f"/api/config/config_entries/entry/{entry_id}/reload"
+        )
+        await self.register(self.devices[slot])
+
+    async def snapshot(self) -> dict:
+        """Compact, then return the memory section of the hub diagnostics."""
+        await self._request("POST", f"/api/services/{DOMAIN}/compact", json={})
+        hub_id = (await self.entries())["Desktop App"]
+        diagnostics = await self._request(
+            "GET", f"/api/diagnostics/config_entry/{hub_id}"
+        )
+        return diagnostics["data"]["memory"]
+
+    async def cycle(self, number: int) -> None:
+        """Run one simulated day of the fleet."""
+        for _ in range(self.args.updates):
+            await asyncio.gather(*(self.update(device) for device in self.devices))
+
+        # Some devices churn; others restart or go quiet for a while
+        for slot in range(len(self.devices)):
+            roll = random.random()
+            if roll < self.args.churn:
+                await self.replace(slot)
+            elif roll < self.args.churn * 2:
+                await self.reload(slot)
+            elif roll < self.args.churn * 3:
+                await self.register(self.devices[slot])
+
+        if number % 10 == 0 and self.args.heartbeat_timeout:
+            # Let every device miss its heartbeat once in a while
+            await asyncio.sleep(self.args.heartbeat_timeout + 1.5)
+
+
+def check(
+    args: argparse.Namespace, baseline: dict, memory: dict, removed: int
+) -> list[str]:
+    """Return the budgets a snapshot breaks."""
+    live_devices = args.devices
+    live_sensors = args.devices * args.sensors
+    failures = []
+
+    growth = memory["traced"]["bytes"] - baseline["traced"]["bytes"]
+    if growth / live_devices > args.device_budget:
+        failures.append(
+            f"retained {growth / live_devices:.0f} bytes per device "
+            f"(budget {args.device_budget})"
+        )
+    if growth / live_sensors > args.sensor_budget:
+        failures.append(
+            f"retained {growth / live_sensors:.0f} bytes per sensor "
+            f"(budget {args.sensor_budget})"
+        )
+
+    limits = {
+        "devices": live_devices,
+        "registered_sensors": live_sensors,
+        "sensor_last_seen": live_sensors,
+        "pending_updates": live_sensors,
+        "sensor_sequences": live_sensors,
+        "state_index_sensors": live_sensors,
+        "device_budgets": live_devices,
+        # Removed devices keep a tombstone for the 90-day retention
+        "tombstones": baseline["tombstones"] + removed,
+    }
+    for name, limit in limits.items():
+        if memory[name] > limit:
+            failures.append(f"{name} holds {memory[name]} entries (live {limit})")
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    """Run the soak and return the exit code."""
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        soak = Soak(session, args)
+        await asyncio.gather(*(soak.register(device) for device in soak.devices))
+
+        baseline = await soak.snapshot()
+        if baseline["traced"] is None:
+            print(
+                "Home Assistant is not tracing allocations; "
+                "start it with PYTHONTRACEMALLOC=1",
+                file=sys.stderr,
+            )
+            return 2
+
+        start = time.monotonic()
+        failures: list[str] = []
+        for number in range(1, args.cycles + 1):
+            await soak.cycle(number)
+            if number % args.snapshot_every and number != args.cycles:
+                continue
+
+            memory = await soak.snapshot()
+            growth = memory["traced"]["bytes"] - baseline["traced"]["bytes"]
+            print(
+                f"cycle {number:>5}  requests {soak.requests:>8}  "
+                f"traced {memory['traced']['bytes'] / 1024:>9.1f} KiB  "
+                f"growth {growth / 1024:>+8.1f} KiB  "
+                f"pending {memory['pending_updates']:>6}  "
+                f"listeners {memory['dispatcher_listeners']:>6}  "
+                f"scheduled {memory['scheduled_keys']:>6}"
+            )
+            # Caches and pools fill up during the warm-up; budgets apply to
+            # growth after it
+            if number < args.warmup:
+                baseline = memory
+            else:
+                failures = check(args, baseline, memory, soak.removed)
+
+        print(f"{soak.requests} requests in {time.monotonic() - start:.0f} s")
+        if failures:
+            print("FAIL", *failures, sep="\n  ")
+            for line in memory["traced"]["top_lines"]:
+                print(f"  {line['line']:<30} {line['bytes']:>10} bytes")
+            return 1
+        print("PASS")
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8123")
+    parser.add_argument("--token", default=os.environ.get("HA_TOKEN"))
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--sensors", type=int, default=50)
+    parser.add_argument("--cycles", type=int, default=300)
+    parser.add_argument("--updates", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0.05)
+    parser.add_argument("--heartbeat-timeout", type=float, default=2)
+    parser.add_argument("--snapshot-every", type=int, default=25)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--device-budget", type=int, default=16 * 1024)
+    parser.add_argument("--sensor-budget", type=int, default=256)
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("--token or HA_TOKEN is required")
+    sys.exit(asyncio.run(main(args)))